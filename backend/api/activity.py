@@ -0,0 +1,93 @@
+#!/usr/bin/python3
+"""Write-behind buffer for users.last_activity."""
+from datetime import datetime, timezone
+from os import getenv
+from sqlalchemy.exc import SQLAlchemyError
+from models.engine.db_storage import DBStorage
+import threading
+import time
+
+FLUSH_INTERVAL = int(getenv('SAND00G_ACTIVITY_FLUSH_SECONDS', '30'))
+BUFFER_SIZE = int(getenv('SAND00G_ACTIVITY_BUFFER_SIZE', '10000'))
+
+stats = {'flushed': 0, 'failed': 0}
+
+
+class ActivityBuffer:
+    """
+    Collects the last time each user made a request and writes them to
+    users.last_activity in batches.
+
+    touch() only updates a dict, so requests do not write. flush() takes
+    what has been collected and stores it with DBStorage.touch_users. A
+    failed flush keeps the timestamps for the next one. Reaching
+    max_users starts one flush on a background thread, unless a flush
+    failed less than retry_seconds ago; past max_users the users seen
+    longest ago are dropped.
+    """
+
+    def __init__(self, max_users=10000, retry_seconds=FLUSH_INTERVAL):
+        """Initializes an empty buffer."""
+        self.max_users = max_users
+        self.retry_seconds = retry_seconds
+        self.__pending = {}
+        self.__scheduled = False
+        self.__retry_at = 0.0
+        self.__lock = threading.Lock()
+        self.__flushing = threading.Lock()
+
+    def __len__(self):
+        """Returns the number of users waiting to be written."""
+        return len(self.__pending)
+
+    def touch(self, user_id, now=None):
+        """Records that user_id is active now."""
+        now = now or datetime.now(timezone.utc)
+        with self.__lock:
+            self.__pending.pop(user_id, None)
+            self.__pending[user_id] = now
+            while len(self.__pending) > self.max_users:
+                del self.__pending[next(iter(self.__pending))]
+            start = (len(self.__pending) >= self.max_users and not self.__scheduled
+                     and time.monotonic() >= self.__retry_at)
+            if start:
+                self.__scheduled = True
+        if start:
+            threading.Thread(target=self.__flush_quietly, daemon=True).start()
+
+    def flush(self):
+        """Writes the collected timestamps. Returns the number of users flushed."""
+        with self.__flushing:
+            with self.__lock:
+                seen, self.__pending = self.__pending, {}
+            if not seen:
+                return 0
+            try:
+                DBStorage().touch_users(seen)
+            except Exception:
+                stats['failed'] += 1
+                with self.__lock:
+                    for user_id, last in self.__pending.items():
+                        seen.pop(user_id, None)
+                        seen[user_id] = last
+                    self.__pending = dict(list(seen.items())[-self.max_users:])
+                    self.__retry_at = time.monotonic() + self.retry_seconds
+                raise
+            with self.__lock:
+                self.__retry_at = 0.0
+            stats['flushed'] += len(seen)
+            return len(seen)
+
+    def __flush_quietly(self):
+        """Flushes from a background thread, leaving errors to the next flush."""
+        try:
+            self.flush()
+        except SQLAlchemyError:
+            pass
+        finally:
+            DBStorage().close()
+            with self.__lock:
+                self.__scheduled = False
+
+
+activity = ActivityBuffer(max_users=BUFFER_SIZE)
@@ -1,57 +1,222 @@
 #!/usr/bin/python3
 """Flask app."""
-from flask import Flask
+from flask import Flask, g, jsonify, request, Response
+from flask.cli import AppGroup
+import click
 from flask_cors import CORS
-from flask_jwt_extended import JWTManager
+from flask_jwt_extended import JWTManager, verify_jwt_in_request
+from flask_jwt_extended.exceptions import JWTExtendedException
+from jwt import PyJWTError
 from api.views import app_views
 from dotenv import load_dotenv
 from os import getenv
 from datetime import timedelta, datetime
 import datetime as dt
+import atexit
+import time
 from apscheduler.schedulers.background import BackgroundScheduler
-from models.user import User
+from models.engine.db_storage import DBStorage
+from models.engine.migrations import head_revision
+from models.hashing import HashingBusy, start_pool
+from api.json_provider import json_provider_class
+from api import metrics
+from api.compression import compress
+from api.identity import load_user, user_not_found, forget_users
+from api.activity import activity, FLUSH_INTERVAL
+from api.guest_pool import fill_guest_pool, POOL_SIZE, POOL_INTERVAL
 
 load_dotenv()
 
 app = Flask(__name__)
-cors = CORS(app, resources={r"/api/*": {"origins": "*"}})
+app.json = json_provider_class()(app)
+cors = CORS(app, resources={r"/api/*": {"origins": "*"}},
+            expose_headers=['ETag', 'X-Next-Cursor'])
 app.config['JWT_SECRET_KEY'] = getenv('JWT_SECRET_KEY')
 app.config['JWT_ACCESS_TOKEN_EXPIRES'] = timedelta(minutes=15)
 app.config['JWT_REFRESH_TOKEN_EXPIRES'] = timedelta(days=30)
 jwt = JWTManager(app)
+jwt.user_lookup_loader(load_user)
+jwt.user_lookup_error_loader(user_not_found)
+app.logger.setLevel(getenv('SAND00G_LOG_LEVEL', 'INFO'))
 app.register_blueprint(app_views)
+if getenv('SAND00G_METRICS', '1') == '1':
+    metrics.instrument(app)
+if getenv('SAND00G_COMPRESSION', '1') == '1':
+    app.after_request(compress)
+
+
+def check_schema():
+    """Fails unless the database schema is at the revision the code expects."""
+    if getenv('SAND00G_SCHEMA_CHECK', '1') == '1':
+        DBStorage().check_schema()
+
+
+def looking_up_cli_command():
+    """
+    Tells whether the flask CLI is loading the app to look up one of
+    the app's commands, before it knows which one will run.
+    """
+    ctx = click.get_current_context(silent=True)
+    return ctx is not None and isinstance(ctx.command, click.MultiCommand)
+
+
+# Servers and `flask run` check the schema as they load the app. The app's
+# own commands check it when they start, except the db group, which has
+# to work on an outdated schema to upgrade it.
+if not looking_up_cli_command():
+    check_schema()
+
+db_cli = AppGroup('db', help='Versioned schema migrations.')
+app.cli.add_command(db_cli)
+
+
+@db_cli.command('upgrade')
+@click.argument('revision', default='head')
+def db_upgrade(revision):
+    """Upgrades the schema to a revision, the latest by default."""
+    DBStorage().migrate('upgrade', revision)
+    print(f'Schema at revision {DBStorage().schema_revision()}.')
+
+
+@db_cli.command('downgrade', context_settings={'ignore_unknown_options': True})
+@click.argument('revision')
+def db_downgrade(revision):
+    """Downgrades the schema to a revision, e.g. -1 or base."""
+    DBStorage().migrate('downgrade', revision)
+    print(f'Schema at revision {DBStorage().schema_revision()}.')
+
+
+@db_cli.command('stamp')
+@click.argument('revision')
+def db_stamp(revision):
+    """Records a revision as applied without running it."""
+    DBStorage().migrate('stamp', revision)
+    print(f'Schema stamped at revision {revision}.')
+
+
+@db_cli.command('current')
+def db_current():
+    """Shows the schema revision and whether it is up to date."""
+    current, head = DBStorage().schema_revision(), head_revision()
+    print(f'{current} ({"up to date" if current == head else f"head is {head}"})')
+
+
+@db_cli.command('revision')
+@click.option('-m', '--message', required=True)
+@click.option('--autogenerate', is_flag=True,
+              help='Compare the models with the database to fill in the script.')
+def db_revision(message, autogenerate):
+    """Creates a new migration script."""
+    DBStorage().migrate('revision', message=message, autogenerate=autogenerate,
+                        rev_id=f'{int(head_revision() or 0) + 1:04d}')
+
+
+@app.cli.command('repair-totals')
+def repair_totals():
+    """Rebuilds the user_totals rollup and reports any drift."""
+    check_schema()
+    drift = DBStorage().rebuild_totals()
+    for user_id, stored, actual in drift:
+        if stored is None:
+            print(f'{user_id}: missing, set to income={actual[0]} expenses={actual[1]}')
+        else:
+            print(f'{user_id}: income {stored[0]} -> {actual[0]}, '
+                  f'expenses {stored[1]} -> {actual[1]}')
+    print(f'{len(drift)} user(s) repaired.')
 
 scheduler = BackgroundScheduler()
 
+def flush_activity():
+    """Writes the buffered last_activity of recently active users."""
+    flushed = activity.flush()
+    if flushed:
+        app.logger.debug('flush_activity wrote %d user(s)', flushed)
+
+
 def clean_guest_sessions():
-    """Cleans guest sessions."""
-    from models.engine.db_storage import DBStorage
+    """Deletes guest users inactive for more than 15 minutes.
+
+    Only the process holding the sweep lock does the work, so running
+    the scheduler in every worker does not multiply the sweep. Other
+    workers write their buffered activity every
+    SAND00G_ACTIVITY_FLUSH_SECONDS, well within the 15 minutes.
+    """
+    storage = DBStorage()
+    try:
+        with storage.lock('clean_guest_sessions') as acquired:
+            if not acquired:
+                return
+            activity.flush()
+            started = time.monotonic()
+            cutoff = datetime.now(dt.timezone.utc).replace(tzinfo=None) - timedelta(minutes=15)
+            removed = storage.purge_guests(cutoff, on_batch=forget_users)
+            app.logger.info('clean_guest_sessions removed %s in %.3fs',
+                            removed or 'nothing', time.monotonic() - started)
+    finally:
+        storage.close()
+
+
+def refill_guest_pool():
+    """Keeps the guest pool topped up, from one process at a time."""
     storage = DBStorage()
-    guest_users = [user for user in storage.all(User).values() if user.is_guest]
-    now = datetime.now(dt.timezone.utc)
-    for user in guest_users:
-        if user.last_activity.tzinfo is None:
-            user.last_activity = user.last_activity.replace(tzinfo=dt.timezone.utc)
-        if user.last_activity < now - timedelta(minutes=15):
-            for budget in user.budgets:
-                storage.delete(budget)
-            for savings in user.savings:
-                storage.delete(savings)
-            for transaction in user.transactions:
-                storage.delete(transaction)
-            storage.delete(user)
-    storage.save()
+    try:
+        with storage.lock('fill_guest_pool') as acquired:
+            if acquired:
+                added = fill_guest_pool(storage)
+                if added:
+                    app.logger.info('fill_guest_pool added %d guest(s)', added)
+    finally:
+        storage.close()
 
 scheduler.add_job(func=clean_guest_sessions, trigger='interval', id='clean_guest_sessions', minutes=15)
+scheduler.add_job(func=flush_activity, trigger='interval', id='flush_activity',
+                  seconds=FLUSH_INTERVAL)
+if POOL_SIZE > 0:
+    scheduler.add_job(func=refill_guest_pool, trigger='interval', id='fill_guest_pool',
+                      seconds=POOL_INTERVAL, next_run_time=datetime.now())
+start_pool()
 scheduler.start()
+atexit.register(activity.flush)
+
+
+@app.before_request
+def route_reads():
+    """
+    Lets GET requests and read_only views read from a replica, unless
+    their user wrote in the last SAND00G_REPLICA_PIN_SECONDS.
+    """
+    storage = DBStorage()
+    if not storage.has_replicas():
+        return
+    view = app.view_functions.get(request.endpoint)
+    if request.method not in ('GET', 'HEAD') and not getattr(view, 'read_only', False):
+        return
+    try:
+        verify_jwt_in_request(optional=True)
+    except (JWTExtendedException, PyJWTError):
+        pass
+    user = g.get('user')
+    storage.read_from_replica(user.id if user else None)
+
+
+@app.errorhandler(HashingBusy)
+def hashing_busy(error):
+    """Asks the client to retry when password hashing is saturated."""
+    return jsonify({'error': str(error)}), 503, {'Retry-After': '1'}
+
+
+@app.route('/metrics')
+def get_metrics():
+    """Exports request, cache, hashing and guest pool metrics for Prometheus."""
+    if getenv('SAND00G_METRICS', '1') != '1':
+        return jsonify({'error': 'Not found'}), 404
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
 
 
 @app.teardown_appcontext
 def close_db(error):
     """Close Storage."""
-    from models.engine.db_storage import DBStorage
-    storage = DBStorage()
-    storage.close()
+    DBStorage().close()
 
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port='5000', threaded=True)
\ No newline at end of file
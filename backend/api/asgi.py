@@ -0,0 +1,130 @@
+#!/usr/bin/python3
+"""
+ASGI entry point serving the Flask app on an asyncio event loop.
+
+Each request runs the unchanged Flask views in a greenlet on the loop
+thread, with a DBStorage session on the async engine of an async
+SAND00G_DB_URL (e.g. mysql+asyncmy:// or sqlite+aiosqlite://). Whenever
+a view waits on the database, the request body, the client or password
+hashing, its greenlet yields to the loop, so a single thread keeps many
+requests in flight:
+
+    uvicorn api.asgi:app --workers 4
+"""
+from sqlalchemy.util.concurrency import await_only, greenlet_spawn
+from models.engine.db_storage import DBStorage
+from api.app import app as flask_app
+from api.activity import activity
+import asyncio
+import io
+import sys
+
+
+class RequestBody(io.RawIOBase):
+    """The request body, read from the ASGI receive channel as needed."""
+
+    def __init__(self, receive):
+        """Initializes the stream over receive."""
+        self.receive = receive
+        self.chunk = b''
+        self.more = True
+
+    def readable(self):
+        """The body is readable."""
+        return True
+
+    def readinto(self, buffer):
+        """Fills buffer with the next bytes of the body; 0 at the end."""
+        while not self.chunk and self.more:
+            message = await_only(self.receive())
+            if message['type'] != 'http.request':
+                self.more = False
+                break
+            self.chunk = message.get('body', b'')
+            self.more = message.get('more_body', False)
+        size = min(len(buffer), len(self.chunk))
+        buffer[:size] = self.chunk[:size]
+        self.chunk = self.chunk[size:]
+        return size
+
+
+def wsgi_environ(scope, body):
+    """Builds the WSGI environ of an ASGI HTTP scope."""
+    server = scope.get('server') or ('localhost', 80)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', '').encode('utf-8').decode('latin-1'),
+        'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': str(server[0]),
+        'SERVER_PORT': str(server[1] or 80),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BufferedReader(body),
+        # The server de-chunks the body and marks its end with more_body,
+        # so a body without Content-Length can be read to the end.
+        'wsgi.input_terminated': True,
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    if scope.get('client'):
+        environ['REMOTE_ADDR'], environ['REMOTE_PORT'] = scope['client'][0], str(scope['client'][1])
+    for name, value in scope.get('headers', []):
+        name = name.decode('latin-1').upper().replace('-', '_')
+        value = value.decode('latin-1')
+        if name not in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+            name = 'HTTP_' + name
+        environ[name] = f'{environ[name]},{value}' if name in environ else value
+    return environ
+
+
+def serve(scope, receive, send):
+    """Runs one request through the Flask app, streaming the response to send."""
+    response = {}
+
+    def start_response(status, headers, exc_info=None):
+        if exc_info and response.get('started'):
+            raise exc_info[1].with_traceback(exc_info[2])
+        response['status'] = int(status.split(' ', 1)[0])
+        response['headers'] = [(k.lower().encode('latin-1'), v.encode('latin-1'))
+                               for k, v in headers]
+
+    def start():
+        if not response.get('started'):
+            response['started'] = True
+            await_only(send({'type': 'http.response.start', 'status': response['status'],
+                             'headers': response['headers']}))
+
+    try:
+        chunks = flask_app(wsgi_environ(scope, RequestBody(receive)), start_response)
+        try:
+            for chunk in chunks:
+                if chunk:
+                    start()
+                    await_only(send({'type': 'http.response.body', 'body': chunk,
+                                     'more_body': True}))
+        finally:
+            if hasattr(chunks, 'close'):
+                chunks.close()
+        start()
+        await_only(send({'type': 'http.response.body', 'body': b''}))
+    finally:
+        DBStorage().close()
+
+
+async def app(scope, receive, send):
+    """The ASGI application."""
+    if scope['type'] == 'http':
+        await greenlet_spawn(serve, scope, receive, send)
+    elif scope['type'] == 'lifespan':
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await asyncio.get_running_loop().run_in_executor(None, activity.flush)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
@@ -0,0 +1,128 @@
+#!/usr/bin/python3
+"""Response caches for the API."""
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from os import getenv
+import threading
+import time
+
+
+class LRUCache:
+    """An in-process LRU cache whose entries expire after a TTL.
+
+    Any shared backend must provide the same get/set/delete methods.
+    """
+
+    def __init__(self, max_entries=1024, ttl=60):
+        """Initializes an empty cache."""
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.__entries = OrderedDict()
+        self.__lock = threading.Lock()
+
+    def get(self, key):
+        """Returns the value stored under key, or None."""
+        with self.__lock:
+            entry = self.__entries.get(key)
+            if entry is None:
+                return None
+            value, expires = entry
+            if expires < time.monotonic():
+                del self.__entries[key]
+                return None
+            self.__entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        """Stores value under key, evicting the least recently used entry."""
+        with self.__lock:
+            self.__entries[key] = (value, time.monotonic() + self.ttl)
+            self.__entries.move_to_end(key)
+            while len(self.__entries) > self.max_entries:
+                self.__entries.popitem(last=False)
+
+    def delete(self, key):
+        """Discards the value stored under key."""
+        with self.__lock:
+            self.__entries.pop(key, None)
+
+
+class SummaryCache:
+    """Caches the summary of each user along with its data_version.
+
+    users.data_version is bumped in the transaction of every write to a
+    user's budgets, savings or transactions, on whichever worker handles
+    it, so a cached summary is only served for the version it was
+    computed from. invalidate() drops the entry early on the worker that
+    made the write.
+    """
+
+    def __init__(self, backend):
+        """Initializes the cache on top of a storage backend."""
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+        self.__lock = threading.Lock()
+        self.__deferred = ContextVar('deferred_invalidations', default=None)
+
+    def get(self, user_id, version):
+        """
+        Returns the summary of a user cached for data_version version,
+        or None. Read version once, before the summary is computed, and
+        pass the same value to set().
+        """
+        entry = self.backend.get(f'summary:{user_id}')
+        value = entry[1] if entry is not None and entry[0] == version else None
+        with self.__lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return value
+
+    def set(self, user_id, version, summary):
+        """Caches the summary of a user computed at data_version version."""
+        entry = self.backend.get(f'summary:{user_id}')
+        if entry is None or entry[0] < version:
+            self.backend.set(f'summary:{user_id}', (version, summary))
+
+    def invalidate(self, user_id):
+        """Discards the cached summary of a user, or defers it, see deferred()."""
+        pending = self.__deferred.get()
+        if pending is not None:
+            pending.add(user_id)
+        else:
+            self.backend.delete(f'summary:{user_id}')
+
+    @contextmanager
+    def deferred(self):
+        """
+        Holds back the invalidations made in the block until it exits,
+        and drops them if it raises. Wrap a database transaction in it so
+        its writes are committed before their summaries are discarded.
+        """
+        pending = set()
+        token = self.__deferred.set(pending)
+        try:
+            yield
+        finally:
+            self.__deferred.reset(token)
+        for user_id in pending:
+            self.invalidate(user_id)
+
+    def stats(self):
+        """Returns the hit and miss counters."""
+        return {'hits': self.hits, 'misses': self.misses}
+
+
+def make_backend():
+    """Creates the cache backend selected by SAND00G_CACHE_BACKEND."""
+    name = getenv('SAND00G_CACHE_BACKEND', 'memory')
+    if name == 'memory':
+        return LRUCache(max_entries=int(getenv('SAND00G_CACHE_SIZE', '1024')),
+                        ttl=int(getenv('SAND00G_CACHE_TTL', '60')))
+    raise ValueError(f'Unknown cache backend: {name}')
+
+
+summary_cache = SummaryCache(make_backend())
@@ -0,0 +1,38 @@
+#!/usr/bin/python3
+"""Columnar (struct-of-arrays) JSON responses."""
+from flask import request
+
+COLUMNAR_MIMETYPE = 'application/vnd.sand00g.columnar+json'
+FORMATS = ('rows', 'columnar')
+
+
+def response_format():
+    """
+    Returns the format the request asks for: `format` from the query
+    string, else columnar when Accept prefers COLUMNAR_MIMETYPE to
+    application/json, else rows. Raises ValueError on an unknown format.
+    """
+    format = request.args.get('format')
+    if format:
+        if format not in FORMATS:
+            raise ValueError(f"format must be one of {', '.join(FORMATS)}")
+        return format
+    best = request.accept_mimetypes.best_match(('application/json', COLUMNAR_MIMETYPE))
+    return 'columnar' if best == COLUMNAR_MIMETYPE else 'rows'
+
+
+def to_columns(rows, columns):
+    """
+    Turns a list of dicts into {"columns": [...], "values": [[...], ...]},
+    where values holds one array per column, in the order of columns.
+    """
+    return {'columns': list(columns),
+            'values': [[row[name] for row in rows] for name in columns]}
+
+
+def negotiated(response, format):
+    """Labels response with its format; it varies on Accept."""
+    if format == 'columnar':
+        response.mimetype = COLUMNAR_MIMETYPE
+    response.vary.add('Accept')
+    return response
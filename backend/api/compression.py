@@ -0,0 +1,63 @@
+#!/usr/bin/python3
+"""Response compression negotiated from Accept-Encoding."""
+from flask import request
+from os import getenv
+import gzip
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+MIN_SIZE = int(getenv('SAND00G_COMPRESS_MIN_BYTES', '1024'))
+COMPRESSIBLE = ('application/json', 'application/x-ndjson', 'text/csv', 'text/plain')
+
+# In order of preference when the client accepts several equally.
+ENCODERS = {}
+if zstandard is not None:
+    ENCODERS['zstd'] = lambda data: zstandard.compress(data, 3)
+if brotli is not None:
+    ENCODERS['br'] = lambda data: brotli.compress(data, quality=5)
+ENCODERS['gzip'] = lambda data: gzip.compress(data, compresslevel=6, mtime=0)
+
+
+def compressible(mimetype):
+    """Tells whether a body of mimetype is worth compressing."""
+    return mimetype in COMPRESSIBLE or mimetype.endswith('+json')
+
+
+def encoded_etags(etag):
+    """Returns etag and the ETags of its compressed variants."""
+    return [etag] + [f'{etag}-{encoding}' for encoding in ENCODERS]
+
+
+def compress(response):
+    """
+    Compresses a JSON or text response with the best encoding the client
+    accepts: zstd or br when their packages are installed, else gzip.
+    Streamed responses and bodies under MIN_SIZE bytes are sent as is.
+    A strong ETag gets the encoding as a suffix, since the compressed
+    bytes are another representation.
+    """
+    if response.status_code != 200 or response.direct_passthrough or \
+            response.is_streamed or 'Content-Encoding' in response.headers or \
+            not compressible(response.mimetype):
+        return response
+    response.vary.add('Accept-Encoding')
+    encoding = request.accept_encodings.best_match(list(ENCODERS))
+    if encoding is None:
+        return response
+    data = response.get_data()
+    if len(data) < MIN_SIZE:
+        return response
+    response.set_data(ENCODERS[encoding](data))
+    response.headers['Content-Encoding'] = encoding
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(f'{etag}-{encoding}')
+    return response
@@ -0,0 +1,42 @@
+#!/usr/bin/python3
+"""Conditional GET helpers for the API."""
+from flask import request, make_response
+from models.engine.db_storage import DBStorage
+from api.compression import encoded_etags
+import hashlib
+
+
+def user_etag(user_id, variant='', version=None):
+    """
+    Returns the ETag of the current request for a user's data.
+
+    It is derived from the user's data_version, which every write to the
+    user's budgets, savings and transactions increments, from the
+    request path and query string, and from variant, which names a
+    representation chosen by request headers. Pass version when the
+    caller has already read the data_version.
+    """
+    if version is None:
+        version = DBStorage().data_version(user_id)
+    raw = f'{user_id}:{version}:{variant}:{request.path}?{request.query_string.decode()}'
+    return hashlib.sha1(raw.encode()).hexdigest()
+
+
+def not_modified(etag):
+    """
+    Returns a 304 response when the client already holds etag, or one of
+    its compressed variants, else None.
+    """
+    held = next((tag for tag in encoded_etags(etag) if tag in request.if_none_match), None)
+    if held is None:
+        return None
+    response = make_response('', 304)
+    set_validator(response, held)
+    return response
+
+
+def set_validator(response, etag):
+    """Attaches etag to response and asks clients to revalidate it."""
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
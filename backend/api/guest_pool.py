@@ -0,0 +1,56 @@
+#!/usr/bin/python3
+"""Pool of guest accounts provisioned ahead of /api/guest_session."""
+from models.engine.db_storage import DBStorage
+from models.hashing import hash_password
+from datetime import datetime, timezone
+from os import getenv
+import uuid
+
+POOL_SIZE = int(getenv('SAND00G_GUEST_POOL_SIZE', '20'))
+POOL_INTERVAL = int(getenv('SAND00G_GUEST_POOL_INTERVAL', '30'))
+GUEST_PASSWORD = 'guest_password'
+
+stats = {'claimed': 0, 'empty': 0}
+
+
+def fill_guest_pool(storage=None):
+    """
+    Tops the pool up to POOL_SIZE unclaimed guests.
+
+    Provisioned guests have a NULL last_activity, which both marks them
+    as unclaimed and keeps the guest sweep away from them. Returns the
+    number of guests added.
+    """
+    from api.views.user_routes import DEFAULT_BUDGETS, DEFAULT_SAVINGS
+    storage = storage or DBStorage()
+    depth = storage.guest_pool_depth()
+    missing = max(POOL_SIZE - depth, 0)
+    if missing:
+        now = datetime.now(timezone.utc)
+        password = hash_password(GUEST_PASSWORD)
+        users, budgets, savings = [], [], []
+        for _ in range(missing):
+            user_id = str(uuid.uuid4())
+            users.append({'id': user_id, 'username': f'guest_{uuid.uuid4()}',
+                          'password': password, 'is_guest': True,
+                          'last_activity': None, 'created_at': now, 'updated_at': now})
+            budgets.extend({'id': str(uuid.uuid4()), 'user_id': user_id, 'spent': 0.0,
+                            'created_at': now, 'updated_at': now, **b}
+                           for b in DEFAULT_BUDGETS)
+            savings.extend({'id': str(uuid.uuid4()), 'user_id': user_id, 'saved': 0.0,
+                            'created_at': now, 'updated_at': now, **s}
+                           for s in DEFAULT_SAVINGS)
+        storage.add_guests(users, budgets, savings)
+    return missing
+
+
+def claim_guest():
+    """Returns a provisioned guest marked as active, or None if the pool is dry."""
+    if POOL_SIZE <= 0:
+        return None
+    guest = DBStorage().claim_guest(datetime.now(timezone.utc))
+    if guest is None:
+        stats['empty'] += 1
+    else:
+        stats['claimed'] += 1
+    return guest
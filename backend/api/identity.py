@@ -0,0 +1,50 @@
+#!/usr/bin/python3
+"""Resolves the JWT identity of a request to a cached user record."""
+from collections import namedtuple
+from flask import current_app, g, jsonify
+from os import getenv
+from api.activity import activity
+from api.cache import LRUCache
+from models.engine.db_storage import DBStorage
+from models.user import User
+
+UserRecord = namedtuple('UserRecord', ['id', 'username', 'role', 'is_guest'])
+
+user_cache = LRUCache(max_entries=int(getenv('SAND00G_USER_CACHE_SIZE', '4096')),
+                      ttl=int(getenv('SAND00G_USER_CACHE_TTL', '30')))
+
+
+def identity_user_id(identity):
+    """Returns the user id of a JWT identity, a dict or a bare id."""
+    return identity if isinstance(identity, str) else identity.get('userId')
+
+
+def load_user(jwt_header, jwt_data):
+    """
+    Resolves the identity of a verified token to a UserRecord, kept in
+    user_cache and exposed as g.user. Returns None when the user no
+    longer exists, which jwt_required answers with user_not_found().
+    The request is recorded as activity of the user.
+    """
+    user_id = identity_user_id(jwt_data[current_app.config['JWT_IDENTITY_CLAIM']])
+    record = user_cache.get(user_id)
+    if record is None:
+        user = DBStorage().get(User, id=user_id)
+        if user is None:
+            return None
+        record = UserRecord(user.id, user.username, user.role, user.is_guest)
+        user_cache.set(user_id, record)
+    activity.touch(user_id)
+    g.user = record
+    return record
+
+
+def user_not_found(jwt_header, jwt_data):
+    """Answers requests whose token names a deleted user."""
+    return jsonify({'error': 'User not found'}), 404
+
+
+def forget_users(user_ids):
+    """Drops deleted users from user_cache."""
+    for user_id in user_ids:
+        user_cache.delete(user_id)
@@ -0,0 +1,78 @@
+#!/usr/bin/python3
+"""JSON encoding for API responses."""
+from datetime import datetime, timezone
+from flask.json.provider import DefaultJSONProvider
+from os import getenv
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+JSON_BACKEND = getenv('SAND00G_JSON_BACKEND', 'auto')
+DAYS = ('Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun')
+MONTHS = ('', 'Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun',
+          'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec')
+
+
+def http_date(value):
+    """
+    Formats a datetime like werkzeug.http.http_date, treating naive
+    values as UTC, without going through strftime.
+    """
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc)
+    return (f'{DAYS[value.weekday()]}, {value.day:02d} {MONTHS[value.month]} '
+            f'{value.year:04d} {value.hour:02d}:{value.minute:02d}:{value.second:02d} GMT')
+
+
+def default(value):
+    """Encodes what JSON cannot, the way Flask's default provider does."""
+    if isinstance(value, datetime):
+        return http_date(value)
+    return DefaultJSONProvider.default(value)
+
+
+class JSONProvider(DefaultJSONProvider):
+    """The standard provider with a faster datetime encoder."""
+    default = staticmethod(default)
+
+
+class OrjsonProvider(JSONProvider):
+    """
+    Encodes responses with orjson.
+
+    Keys are sorted and datetimes go through the same default as the
+    standard provider, so the output is the same.
+    """
+    options = orjson.OPT_SORT_KEYS | orjson.OPT_PASSTHROUGH_DATETIME if orjson else 0
+
+    def dumps(self, obj, **kwargs):
+        """Serializes obj to a JSON string."""
+        return orjson.dumps(obj, default=self.default, option=self.options).decode()
+
+    def loads(self, s, **kwargs):
+        """Deserializes a JSON string or bytes."""
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        """Builds a JSON response without decoding the encoded bytes."""
+        if self._app.debug:
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(
+            orjson.dumps(obj, default=self.default,
+                         option=self.options | orjson.OPT_APPEND_NEWLINE),
+            mimetype=self.mimetype)
+
+
+def json_provider_class():
+    """
+    Picks the provider from SAND00G_JSON_BACKEND: orjson, stdlib, or
+    auto to use orjson when it is installed.
+    """
+    if JSON_BACKEND == 'orjson' and orjson is None:
+        raise RuntimeError('SAND00G_JSON_BACKEND=orjson but orjson is not installed')
+    if JSON_BACKEND in ('orjson', 'auto') and orjson is not None:
+        return OrjsonProvider
+    return JSONProvider
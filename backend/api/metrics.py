@@ -0,0 +1,256 @@
+#!/usr/bin/python3
+"""
+Per-request SQL and latency instrumentation, exported on /metrics.
+
+Engine and ORM events add each statement and loaded row to the metrics
+of the request running in the current context; the Flask request hooks
+then observe them into histograms labelled by endpoint and method.
+"""
+from contextvars import ContextVar
+from flask import current_app, request
+from os import getenv
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from models.base_model import Base
+from models.engine.db_storage import DBStorage
+from models import hashing
+from api import activity, guest_pool
+from api.cache import summary_cache
+import bisect
+import json
+import threading
+import time
+
+SLOW_REQUEST_MS = float(getenv('SAND00G_SLOW_REQUEST_MS', '500'))
+N_PLUS_ONE = int(getenv('SAND00G_N_PLUS_ONE_THRESHOLD', '10'))
+SECONDS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNTS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 100, 250)
+ROWS = (0, 1, 10, 50, 100, 500, 1000, 5000, 10000, 50000)
+
+_current = ContextVar('request_metrics', default=None)
+
+
+class RequestMetrics:
+    """What one request spent in the database and in serialization."""
+
+    __slots__ = ('started', 'queries', 'sql_seconds', 'slowest_sql', 'slowest_statement',
+                 'rows', 'serialize_seconds', 'statements')
+
+    def __init__(self):
+        """Starts the clock."""
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.sql_seconds = 0.0
+        self.slowest_sql = 0.0
+        self.slowest_statement = None
+        self.rows = 0
+        self.serialize_seconds = 0.0
+        self.statements = {}
+
+
+class Histogram:
+    """A Prometheus histogram with one series per label tuple."""
+
+    def __init__(self, name, help, labels, buckets):
+        """Initializes an empty histogram."""
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = buckets
+        self.__series = {}
+        self.__lock = threading.Lock()
+
+    def observe(self, labels, value):
+        """Adds value to the series of labels."""
+        with self.__lock:
+            series = self.__series.get(labels)
+            if series is None:
+                series = self.__series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][bisect.bisect_left(self.buckets, value)] += 1
+            series[1] += value
+
+    def render(self):
+        """Returns the histogram in the Prometheus text format."""
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} histogram']
+        with self.__lock:
+            series = [(labels, list(counts), total)
+                      for labels, (counts, total) in sorted(self.__series.items())]
+        for labels, counts, total in series:
+            pairs = [f'{key}="{value}"' for key, value in zip(self.labels, labels)]
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), counts):
+                cumulative += count
+                le = ','.join(pairs + [f'le="{bound}"'])
+                lines.append(f'{self.name}_bucket{{{le}}} {cumulative}')
+            selector = '{' + ','.join(pairs) + '}'
+            lines.append(f'{self.name}_sum{selector} {total}')
+            lines.append(f'{self.name}_count{selector} {cumulative}')
+        return lines
+
+
+LABELS = ('endpoint', 'method')
+HISTOGRAMS = {
+    'latency': Histogram('sand00g_request_seconds', 'Request latency.', LABELS, SECONDS),
+    'queries': Histogram('sand00g_request_queries', 'SQL statements per request.',
+                         LABELS, COUNTS),
+    'sql': Histogram('sand00g_request_sql_seconds', 'Time spent in SQL per request.',
+                     LABELS, SECONDS),
+    'slowest_sql': Histogram('sand00g_request_slowest_sql_seconds',
+                             'Slowest SQL statement per request.', LABELS, SECONDS),
+    'rows': Histogram('sand00g_request_rows_loaded', 'ORM rows loaded per request.',
+                      LABELS, ROWS),
+    'serialize': Histogram('sand00g_request_serialize_seconds',
+                           'JSON encoding time per request.', LABELS, SECONDS),
+}
+_responses = {}
+_responses_lock = threading.Lock()
+
+
+def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    """Starts timing a statement run on behalf of a request."""
+    if _current.get() is not None:
+        conn.info.setdefault('metrics_started', []).append(time.perf_counter())
+
+
+def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    """Adds a statement to the metrics of its request."""
+    metrics = _current.get()
+    started = conn.info.get('metrics_started')
+    if metrics is None or not started:
+        return
+    elapsed = time.perf_counter() - started.pop()
+    metrics.queries += 1
+    metrics.sql_seconds += elapsed
+    if elapsed > metrics.slowest_sql:
+        metrics.slowest_sql = elapsed
+        metrics.slowest_statement = statement
+    metrics.statements[statement] = metrics.statements.get(statement, 0) + 1
+
+
+def count_loaded_row(target, context):
+    """Adds a row loaded into an ORM instance to the metrics of its request."""
+    metrics = _current.get()
+    if metrics is not None:
+        metrics.rows += 1
+
+
+def start_request():
+    """
+    Starts collecting metrics for the request. The token is kept in the
+    environ rather than on g, which nested request contexts share.
+    """
+    request.environ['sand00g.metrics_token'] = _current.set(RequestMetrics())
+
+
+def finish_request(response):
+    """Records the metrics of the request and logs it if it was slow."""
+    metrics = _current.get()
+    if metrics is None:
+        return response
+    elapsed = time.perf_counter() - metrics.started
+    labels = (request.endpoint or 'unmatched', request.method)
+    HISTOGRAMS['latency'].observe(labels, elapsed)
+    HISTOGRAMS['queries'].observe(labels, metrics.queries)
+    HISTOGRAMS['sql'].observe(labels, metrics.sql_seconds)
+    HISTOGRAMS['slowest_sql'].observe(labels, metrics.slowest_sql)
+    HISTOGRAMS['rows'].observe(labels, metrics.rows)
+    HISTOGRAMS['serialize'].observe(labels, metrics.serialize_seconds)
+    key = labels + (str(response.status_code),)
+    with _responses_lock:
+        _responses[key] = _responses.get(key, 0) + 1
+
+    repeated = [(statement, count) for statement, count in metrics.statements.items()
+                if count >= N_PLUS_ONE]
+    for statement, count in repeated:
+        current_app.logger.warning('possible N+1 in %s %s: %d runs of %s',
+                                   request.method, request.path, count,
+                                   ' '.join(statement.split()))
+    if elapsed * 1000 >= SLOW_REQUEST_MS:
+        current_app.logger.warning('slow request %s', json.dumps({
+            'method': request.method, 'path': request.path, 'endpoint': labels[0],
+            'status': response.status_code, 'ms': round(elapsed * 1000, 2),
+            'queries': metrics.queries, 'sql_ms': round(metrics.sql_seconds * 1000, 2),
+            'slowest_sql_ms': round(metrics.slowest_sql * 1000, 2),
+            'slowest_sql': ' '.join((metrics.slowest_statement or '').split()),
+            'rows': metrics.rows,
+            'serialize_ms': round(metrics.serialize_seconds * 1000, 2),
+        }))
+    return response
+
+
+def end_request(error):
+    """Stops collecting metrics for the request."""
+    token = request.environ.pop('sand00g.metrics_token', None)
+    if token is not None:
+        _current.reset(token)
+
+
+def timed(encode):
+    """Wraps a JSON provider's response method to time the encoding."""
+    def response(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return encode(*args, **kwargs)
+        finally:
+            metrics = _current.get()
+            if metrics is not None:
+                metrics.serialize_seconds += time.perf_counter() - started
+    return response
+
+
+def instrument(app):
+    """Installs the SQL, ORM and request hooks on app."""
+    event.listen(Engine, 'before_cursor_execute', before_cursor_execute)
+    event.listen(Engine, 'after_cursor_execute', after_cursor_execute)
+    event.listen(Base, 'load', count_loaded_row, propagate=True)
+    app.json.response = timed(app.json.response)
+    app.before_request(start_request)
+    app.after_request(finish_request)
+    app.teardown_request(end_request)
+
+
+def gauge(name, help, value, type='gauge'):
+    """Returns the lines of a single unlabelled sample."""
+    return [f'# HELP {name} {help}', f'# TYPE {name} {type}', f'{name} {value}']
+
+
+def render():
+    """Returns every metric in the Prometheus text format."""
+    lines = []
+    for histogram in HISTOGRAMS.values():
+        lines.extend(histogram.render())
+    lines += ['# HELP sand00g_responses_total Responses by endpoint, method and status.',
+              '# TYPE sand00g_responses_total counter']
+    with _responses_lock:
+        responses = sorted(_responses.items())
+    for (endpoint, method, status), count in responses:
+        lines.append(f'sand00g_responses_total{{endpoint="{endpoint}",method="{method}",'
+                     f'status="{status}"}} {count}')
+
+    cache = summary_cache.stats()
+    lines += gauge('sand00g_summary_cache_hits_total', 'Summary cache hits.',
+                   cache['hits'], 'counter')
+    lines += gauge('sand00g_summary_cache_misses_total', 'Summary cache misses.',
+                   cache['misses'], 'counter')
+    hashes = dict(hashing.stats)
+    for key in ('hashes', 'rejected', 'timeouts'):
+        lines += gauge(f'sand00g_hashing_{key}_total', f'Password hashing {key}.',
+                       hashes[key], 'counter')
+    for key in ('queue_wait_seconds', 'hash_seconds'):
+        lines += gauge(f'sand00g_hashing_{key}_total', f'Password hashing {key}.',
+                       hashes[key], 'counter')
+        lines += gauge(f'sand00g_hashing_{key}_max', f'Slowest password hashing {key}.',
+                       hashes[f'{key}_max'])
+    lines += gauge('sand00g_guest_pool_depth', 'Unclaimed guests in the pool.',
+                   DBStorage().guest_pool_depth())
+    lines += gauge('sand00g_guest_pool_claimed_total', 'Guest sessions served from the pool.',
+                   guest_pool.stats['claimed'], 'counter')
+    lines += gauge('sand00g_guest_pool_empty_total', 'Guest sessions that found the pool empty.',
+                   guest_pool.stats['empty'], 'counter')
+    lines += gauge('sand00g_activity_pending', 'Users whose last activity is not written yet.',
+                   len(activity.activity))
+    lines += gauge('sand00g_activity_flushed_total', 'User last activity timestamps written.',
+                   activity.stats['flushed'], 'counter')
+    lines += gauge('sand00g_activity_flush_failures_total', 'Failed last activity flushes.',
+                   activity.stats['failed'], 'counter')
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,51 @@
+#!/usr/bin/python3
+"""Keyset pagination helpers for the API."""
+import base64
+from datetime import datetime, timedelta, timezone
+
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 500
+
+
+def parse_limit(value, default=DEFAULT_LIMIT, maximum=MAX_LIMIT):
+    """Parses a page size, raising ValueError when it is invalid."""
+    if value is None:
+        return default
+    limit = int(value)
+    if limit < 1:
+        raise ValueError("limit must be positive")
+    return min(limit, maximum)
+
+
+def parse_date(value, end_of_day=False):
+    """
+    Parses a YYYY-MM-DD date or an ISO 8601 datetime.
+
+    With end_of_day, a bare date is moved to the start of the next day so
+    it can be used as an exclusive upper bound. A datetime with a UTC
+    offset is converted to naive UTC, the way dates are stored.
+    """
+    if value is None:
+        return None
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    if end_of_day and len(value) == 10:
+        parsed += timedelta(days=1)
+    return parsed
+
+
+def encode_cursor(date, obj_id):
+    """Encodes a (date, id) position as an opaque cursor."""
+    raw = f'{date.isoformat()}|{obj_id}'.encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Decodes a cursor into its (date, id) position."""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        date, obj_id = base64.urlsafe_b64decode(padded).decode().split('|', 1)
+        return datetime.fromisoformat(date), obj_id
+    except (ValueError, UnicodeDecodeError):
+        raise ValueError("Invalid cursor")
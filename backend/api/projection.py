@@ -0,0 +1,26 @@
+#!/usr/bin/python3
+"""Field projection helpers for the API."""
+from sqlalchemy import inspect
+
+
+def columns(cls, fields=None):
+    """Returns the names of fields, or of every column of cls, in column order."""
+    return [attr.key for attr in inspect(cls).column_attrs
+            if fields is None or attr.key in fields]
+
+
+def parse_fields(cls, value):
+    """
+    Parses a comma-separated `fields` argument against the columns of cls.
+
+    Returns the selected column names in column order, or None when value
+    is empty so every column is returned. Raises ValueError on an unknown
+    field.
+    """
+    if not value:
+        return None
+    requested = {name.strip() for name in value.split(',') if name.strip()}
+    unknown = requested.difference(columns(cls))
+    if unknown:
+        raise ValueError(f"Unknown field(s): {', '.join(sorted(unknown))}")
+    return tuple(columns(cls, requested)) or None
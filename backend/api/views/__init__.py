@@ -4,7 +4,16 @@ from flask import Blueprint
 
 app_views = Blueprint('app_views', __name__, url_prefix='/api/')
 
+
+def read_only(view):
+    """Marks a view that only reads, so a read replica may serve it."""
+    view.read_only = True
+    return view
+
+
+from api.views.batch_routes import *
 from api.views.budget_routes import *
+from api.views.export_routes import *
 from api.views.savings_routes import *
 from api.views.summary_routes import *
 from api.views.transaction_routes import *
@@ -0,0 +1,104 @@
+#!/usr/bin/python3
+"""Batch Route."""
+from flask import current_app, request, jsonify
+from werkzeug.exceptions import HTTPException
+from api.views import app_views
+from api.cache import summary_cache
+from models.engine.db_storage import DBStorage
+from flask_jwt_extended import jwt_required
+from os import getenv
+
+MAX_BATCH_OPERATIONS = int(getenv('SAND00G_BATCH_MAX_OPERATIONS', '100'))
+BATCH_MODES = ('atomic', 'independent')
+BATCH_ENDPOINTS = frozenset('app_views.' + name for name in (
+    'create_budget', 'get_budget', 'update_budget', 'delete_budget',
+    'add_expense', 'delete_expense',
+    'create_saving', 'get_saving', 'update_saving', 'delete_saving',
+    'add_contribution', 'delete_contribution',
+    'create_transaction', 'delete_transaction',
+))
+
+
+class BatchAborted(Exception):
+    """Rolls an atomic batch back after a failed operation."""
+
+
+def run_operation(operation):
+    """
+    Runs one operation through its route handler, in a request context
+    of its own carrying the batch's Authorization header, and returns
+    its (status, body).
+    """
+    path = str(operation.get('path', '')).lstrip('/')
+    if not path.startswith('api/'):
+        path = 'api/' + path
+    with current_app.test_request_context(
+            '/' + path, method=str(operation.get('method', 'GET')).upper(),
+            json=operation.get('body'),
+            headers={'Authorization': request.headers.get('Authorization', '')}):
+        try:
+            if request.routing_exception is None and request.endpoint not in BATCH_ENDPOINTS:
+                return 400, {'error': 'Operation not allowed in a batch'}
+            response = current_app.make_response(current_app.dispatch_request())
+        except HTTPException as e:
+            return e.code, {'error': e.name}
+        except Exception as e:
+            try:
+                response = current_app.make_response(current_app.handle_user_exception(e))
+            except Exception:
+                current_app.logger.exception('batch operation %s %s failed',
+                                             request.method, request.path)
+                return 500, {'error': 'Internal server error'}
+        return response.status_code, response.get_json(silent=True)
+
+
+@app_views.route('/batch', methods=['POST'])
+@jwt_required()
+def batch():
+    """
+    Run a list of budget, savings and transaction operations in one
+    database transaction.
+
+    Each operation is {"method", "path", "body"} for one of the
+    BATCH_ENDPOINTS, and is handled by that route. In atomic mode the
+    first failed operation rolls everything back and the rest are not
+    run; in independent mode each operation runs in a SAVEPOINT and only
+    failed ones are rolled back. Summaries are invalidated once the
+    batch has committed.
+    """
+    data = request.get_json()
+    if not data:
+        return jsonify({'error': 'Missing data'}), 400
+
+    operations = data.get('operations')
+    mode = data.get('mode', 'atomic')
+    if mode not in BATCH_MODES:
+        return jsonify({'error': f"mode must be one of {', '.join(BATCH_MODES)}"}), 400
+    if not isinstance(operations, list) or not operations or \
+            not all(isinstance(operation, dict) for operation in operations):
+        return jsonify({'error': 'operations must be a non-empty list of objects'}), 400
+    if len(operations) > MAX_BATCH_OPERATIONS:
+        return jsonify({'error': f'At most {MAX_BATCH_OPERATIONS} operations per batch'}), 400
+
+    storage = DBStorage()
+    results = []
+    committed = True
+    try:
+        with summary_cache.deferred(), storage.batch():
+            for operation in operations:
+                savepoint = storage.savepoint() if mode == 'independent' else None
+                status, body = run_operation(operation)
+                results.append({'status': status, 'body': body})
+                if status < 400:
+                    if savepoint is not None:
+                        savepoint.commit()
+                elif savepoint is not None:
+                    savepoint.rollback()
+                else:
+                    raise BatchAborted()
+    except BatchAborted:
+        committed = False
+        results += [{'status': 424, 'body': {'error': 'Not run, an earlier operation failed'}}
+                    for _ in operations[len(results):]]
+
+    return jsonify(committed=committed, results=results), 200
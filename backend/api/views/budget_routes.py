@@ -1,11 +1,16 @@
 #!/usr/bin/python3
 """Budget Routes."""
-from flask import request, jsonify
+from flask import g, request, jsonify
 from api.views import app_views
+from api.cache import summary_cache
+from api.conditional import user_etag, not_modified, set_validator
+from api.pagination import parse_limit, encode_cursor, decode_cursor
+from api.projection import parse_fields
+from sqlalchemy import and_, or_
 from models.engine.db_storage import DBStorage
 from models.budget import Budget
-from models.user import User
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from models.expense import Expense
+from flask_jwt_extended import jwt_required
 
 @app_views.route('/budgets', methods=['POST'])
 @jwt_required()
@@ -22,16 +27,11 @@ def create_budget():
     if not name or amount is None:
         return jsonify({'error': 'Missing name or amount'}), 400
 
-    current_user = get_jwt_identity()
-    current_user_id = current_user if isinstance(current_user, str) else current_user.get('userId')
+    current_user_id = g.user.id
 
     storage = DBStorage()
-    user = storage.get(User, id=current_user_id)
-    if not user:
-        return jsonify({'error': 'User not found'}), 404
 
     new_budget = Budget(name=name, amount=float(amount), spent=float(spent), user_id=current_user_id)
-    new_budget.expenses = []
 
     try:
         new_budget.validate()
@@ -40,6 +40,7 @@ def create_budget():
 
     storage.new(new_budget)
     storage.save()
+    summary_cache.invalidate(current_user_id)
 
     return jsonify(new_budget.to_dict()), 201
 
@@ -47,23 +48,32 @@ def create_budget():
 @app_views.route('/budgets', methods=['GET'])
 @jwt_required()
 def get_user_budgets():
-    """Get all budgets for the current user."""
-    current_user = get_jwt_identity()
-    current_user_id = current_user if isinstance(current_user, str) else current_user.get('userId')
+    """Get all budgets for the current user, optionally only some `fields`."""
+    current_user_id = g.user.id
+
+    try:
+        fields = parse_fields(Budget, request.args.get('fields'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    etag = user_etag(current_user_id)
+    unchanged = not_modified(etag)
+    if unchanged:
+        return unchanged
 
     storage = DBStorage()
-    budgets = storage.all(Budget).values()
-    user_budgets = [b.to_dict() for b in budgets if b.user_id == current_user_id]
+    budgets = storage.by_user(Budget, current_user_id, order_by=Budget.created_at,
+                              fields=fields)
+    user_budgets = [b.to_dict(fields) for b in budgets]
 
-    return jsonify(user_budgets), 200
+    return set_validator(jsonify(user_budgets), etag), 200
 
 
 @app_views.route('/budgets/<budget_id>', methods=['GET'])
 @jwt_required()
 def get_budget(budget_id):
     """Retrieve a budget by its ID."""
-    current_user = get_jwt_identity()
-    current_user_id = current_user if isinstance(current_user, str) else current_user.get('userId')
+    current_user_id = g.user.id
 
     storage = DBStorage()
     budget = storage.get(Budget, id=budget_id)
@@ -84,8 +94,7 @@ def update_budget(budget_id):
     if not data:
         return jsonify({'error': 'Missing data'}), 400
 
-    current_user = get_jwt_identity()
-    current_user_id = current_user if isinstance(current_user, str) else current_user.get('userId')
+    current_user_id = g.user.id
 
     storage = DBStorage()
     budget = storage.get(Budget, id=budget_id)
@@ -113,11 +122,9 @@ def update_budget(budget_id):
             budget.validate()
         except ValueError as e:
             return jsonify({'error': str(e)}), 400
-        
-    if 'expenses' in data:
-        budget.expenses = data['expenses']
 
     storage.save()
+    summary_cache.invalidate(current_user_id)
     return jsonify(budget.to_dict()), 200
 
 
@@ -125,8 +132,7 @@ def update_budget(budget_id):
 @jwt_required()
 def delete_budget(budget_id):
     """Delete a budget."""
-    current_user = get_jwt_identity()
-    current_user_id = current_user if isinstance(current_user, str) else current_user.get('userId')
+    current_user_id = g.user.id
 
     storage = DBStorage()
     budget = storage.get(Budget, id=budget_id)
@@ -138,4 +144,107 @@ def delete_budget(budget_id):
 
     storage.delete(budget)
     storage.save()
-    return jsonify({'message': 'Budget deleted successfully'}), 200
\ No newline at end of file
+    summary_cache.invalidate(current_user_id)
+    return jsonify({'message': 'Budget deleted successfully'}), 200
+
+
+@app_views.route('/budgets/<budget_id>/expenses', methods=['POST'])
+@jwt_required()
+def add_expense(budget_id):
+    """Record an expense against a budget and add it to the budget's spent."""
+    data = request.get_json()
+    if not data:
+        return jsonify({'error': 'Missing data'}), 400
+
+    name = data.get('name')
+    amount = data.get('amount')
+    if not name or amount is None:
+        return jsonify({'error': 'Missing name or amount'}), 400
+
+    current_user_id = g.user.id
+
+    storage = DBStorage()
+    budget = storage.get(Budget, id=budget_id)
+    if not budget:
+        return jsonify({'error': 'Budget not found'}), 404
+
+    if budget.user_id != current_user_id:
+        return jsonify({'error': 'Unauthorized'}), 403
+
+    try:
+        expense = Expense(name=name, amount=float(amount), budget_id=budget.id,
+                          user_id=current_user_id)
+        expense.validate()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    storage.new(expense)
+    budget.spent = Budget.spent + expense.amount
+    storage.save()
+    summary_cache.invalidate(current_user_id)
+
+    return jsonify(expense=expense.to_dict(), spent=budget.spent), 201
+
+
+@app_views.route('/budgets/<budget_id>/expenses', methods=['GET'])
+@jwt_required()
+def get_expenses(budget_id):
+    """
+    Get a page of a budget's expenses, newest first.
+
+    Pass the X-Next-Cursor header of a response as `before` to fetch the
+    next page.
+    """
+    current_user_id = g.user.id
+
+    try:
+        limit = parse_limit(request.args.get('limit'))
+        before = request.args.get('before')
+        before = decode_cursor(before) if before else None
+        fields = parse_fields(Expense, request.args.get('fields'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    storage = DBStorage()
+    budget = storage.get(Budget, id=budget_id)
+    if not budget:
+        return jsonify({'error': 'Budget not found'}), 404
+
+    if budget.user_id != current_user_id:
+        return jsonify({'error': 'Unauthorized'}), 403
+
+    filters = [Expense.budget_id == budget_id]
+    if before:
+        filters.append(or_(Expense.created_at < before[0],
+                           and_(Expense.created_at == before[0], Expense.id < before[1])))
+    expenses = storage.by_user(Expense, current_user_id, filters=filters,
+                               order_by=[Expense.created_at.desc(), Expense.id.desc()],
+                               limit=limit + 1, fields=fields)
+
+    response = jsonify([e.to_dict(fields) for e in expenses[:limit]])
+    if len(expenses) > limit:
+        edge = expenses[limit - 1]
+        response.headers['X-Next-Cursor'] = encode_cursor(edge.created_at, edge.id)
+    return response, 200
+
+
+@app_views.route('/budgets/<budget_id>/expenses/<expense_id>', methods=['DELETE'])
+@jwt_required()
+def delete_expense(budget_id, expense_id):
+    """Delete an expense and take it off the budget's spent."""
+    current_user_id = g.user.id
+
+    storage = DBStorage()
+    expense = storage.get(Expense, id=expense_id, budget_id=budget_id)
+    if not expense:
+        return jsonify({'error': 'Expense not found'}), 404
+
+    if expense.user_id != current_user_id:
+        return jsonify({'error': 'Unauthorized'}), 403
+
+    spent = storage.remove_expense(expense)
+    if spent is None:
+        return jsonify({'error': 'Expense not found'}), 404
+    summary_cache.invalidate(current_user_id)
+
+    return jsonify(spent=spent), 200
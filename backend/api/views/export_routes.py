@@ -0,0 +1,89 @@
+#!/usr/bin/python3
+"""Export Routes."""
+from flask import g, request, jsonify, Response, stream_with_context
+from api.views import app_views
+from models.engine.db_storage import DBStorage
+from models.transaction import Transaction
+from models.budget import Budget
+from models.contribution import Contribution
+from models.expense import Expense
+from models.savings import Savings
+from flask_jwt_extended import jwt_required
+from datetime import datetime
+import csv
+import io
+import json
+
+EXPORT_COLUMNS = ['record_type', 'id', 'date', 'name', 'description', 'type',
+                  'amount', 'spent', 'goal', 'saved', 'budget_id', 'savings_id',
+                  'created_at', 'updated_at']
+EXPORT_MIMETYPES = {'csv': 'text/csv', 'ndjson': 'application/x-ndjson'}
+FLUSH_EVERY = 500
+
+
+def export_records(user_id):
+    """
+    Yields every budget, expense, savings entry, contribution and
+    transaction of a user as a dict.
+    """
+    storage = DBStorage()
+    for record_type, cls in (('budget', Budget), ('expense', Expense),
+                             ('savings', Savings), ('contribution', Contribution),
+                             ('transaction', Transaction)):
+        order_by = Transaction.date if cls is Transaction else cls.created_at
+        for obj in storage.stream_by_user(cls, user_id, order_by=order_by):
+            record = obj.to_dict()
+            del record['__class__']
+            record['record_type'] = record_type
+            yield record
+
+
+def json_default(value):
+    """Encodes the values json cannot encode by itself."""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f'{type(value).__name__} is not JSON serializable')
+
+
+def export_csv(records):
+    """Yields CSV text chunks for records."""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=EXPORT_COLUMNS, extrasaction='ignore')
+    writer.writeheader()
+    for count, record in enumerate(records, start=1):
+        writer.writerow({key: value.isoformat() if isinstance(value, datetime) else value
+                         for key, value in record.items()})
+        if count % FLUSH_EVERY == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def export_ndjson(records):
+    """Yields NDJSON text chunks for records."""
+    lines = []
+    for record in records:
+        lines.append(json.dumps(record, default=json_default))
+        if len(lines) == FLUSH_EVERY:
+            yield '\n'.join(lines) + '\n'
+            lines = []
+    if lines:
+        yield '\n'.join(lines) + '\n'
+
+
+@app_views.route('/export', methods=['GET'])
+@jwt_required()
+def export_ledger():
+    """Stream the whole ledger of the current user."""
+    format = request.args.get('format', 'csv')
+    if format not in EXPORT_MIMETYPES:
+        return jsonify({'error': 'Format must be csv or ndjson'}), 400
+
+    current_user_id = g.user.id
+
+    records = export_records(current_user_id)
+    chunks = export_csv(records) if format == 'csv' else export_ndjson(records)
+    response = Response(stream_with_context(chunks), mimetype=EXPORT_MIMETYPES[format])
+    response.headers['Content-Disposition'] = f'attachment; filename=sandoog-export.{format}'
+    return response
@@ -1,11 +1,16 @@
 #!/usr/bin/python3
 """Savings Routes."""
-from flask import request, jsonify
+from flask import g, request, jsonify
 from api.views import app_views
+from api.cache import summary_cache
+from api.conditional import user_etag, not_modified, set_validator
+from api.pagination import parse_limit, encode_cursor, decode_cursor
+from api.projection import parse_fields
+from sqlalchemy import and_, or_
+from models.contribution import Contribution
 from models.savings import Savings
 from models.engine.db_storage import DBStorage
-from models.user import User
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from flask_jwt_extended import jwt_required
 
 @app_views.route('/savings', methods=['POST'])
 @jwt_required()
@@ -22,16 +27,11 @@ def create_saving():
     if not name or goal is None:
         return jsonify({'error': 'Missing name or goal'}), 400
 
-    current_user = get_jwt_identity()
-    current_user_id = current_user if isinstance(current_user, str) else current_user.get('userId')
+    current_user_id = g.user.id
 
     storage = DBStorage()
-    user = storage.get(User, id=current_user_id)
-    if not user:
-        return jsonify({'error': 'User not found'}), 404
 
     new_saving = Savings(name=name, goal=float(goal), saved=float(saved), user_id=current_user_id)
-    new_saving.contributions = []
 
     try:
         new_saving.validate()
@@ -40,6 +40,7 @@ def create_saving():
 
     storage.new(new_saving)
     storage.save()
+    summary_cache.invalidate(current_user_id)
 
     return jsonify(new_saving.to_dict()), 201
 
@@ -47,23 +48,32 @@ def create_saving():
 @app_views.route('/savings', methods=['GET'])
 @jwt_required()
 def get_user_savings():
-    """Get all savings for the current user."""
-    current_user = get_jwt_identity()
-    current_user_id = current_user if isinstance(current_user, str) else current_user.get('userId')
+    """Get all savings for the current user, optionally only some `fields`."""
+    current_user_id = g.user.id
+
+    try:
+        fields = parse_fields(Savings, request.args.get('fields'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    etag = user_etag(current_user_id)
+    unchanged = not_modified(etag)
+    if unchanged:
+        return unchanged
 
     storage = DBStorage()
-    savings = storage.all(Savings).values()
-    user_savings = [s.to_dict() for s in savings if s.user_id == current_user_id]
+    savings = storage.by_user(Savings, current_user_id, order_by=Savings.created_at,
+                              fields=fields)
+    user_savings = [s.to_dict(fields) for s in savings]
 
-    return jsonify(user_savings), 200
+    return set_validator(jsonify(user_savings), etag), 200
 
 
 @app_views.route('/savings/<savings_id>', methods=['GET'])
 @jwt_required()
 def get_saving(savings_id):
     """Retrieve a savings entry by its ID."""
-    current_user = get_jwt_identity()
-    current_user_id = current_user if isinstance(current_user, str) else current_user.get('userId')
+    current_user_id = g.user.id
 
     storage = DBStorage()
     saving = storage.get(Savings, id=savings_id)
@@ -84,8 +94,7 @@ def update_saving(savings_id):
     if not data:
         return jsonify({'error': 'Missing data'}), 400
 
-    current_user = get_jwt_identity()
-    current_user_id = current_user if isinstance(current_user, str) else current_user.get('userId')
+    current_user_id = g.user.id
 
     storage = DBStorage()
     saving = storage.get(Savings, id=savings_id)
@@ -113,11 +122,9 @@ def update_saving(savings_id):
             saving.validate()
         except ValueError as e:
             return jsonify({'error': str(e)}), 400
-    
-    if 'contributions' in data:
-        saving.contributions = data['contributions']
 
     storage.save()
+    summary_cache.invalidate(current_user_id)
     return jsonify(saving.to_dict()), 200
 
 
@@ -125,8 +132,7 @@ def update_saving(savings_id):
 @jwt_required()
 def delete_saving(savings_id):
     """Delete a savings entry."""
-    current_user = get_jwt_identity()
-    current_user_id = current_user if isinstance(current_user, str) else current_user.get('userId')
+    current_user_id = g.user.id
 
     storage = DBStorage()
     saving = storage.get(Savings, id=savings_id)
@@ -138,4 +144,99 @@ def delete_saving(savings_id):
 
     storage.delete(saving)
     storage.save()
-    return jsonify({'message': 'Savings deleted successfully'}), 200
\ No newline at end of file
+    summary_cache.invalidate(current_user_id)
+    return jsonify({'message': 'Savings deleted successfully'}), 200
+
+@app_views.route('/savings/<savings_id>/contributions', methods=['POST'])
+@jwt_required()
+def add_contribution(savings_id):
+    """Record a contribution and add it to the savings entry's saved."""
+    data = request.get_json()
+    if not data:
+        return jsonify({'error': 'Missing data'}), 400
+
+    name = data.get('name')
+    amount = data.get('amount')
+    if not name or amount is None:
+        return jsonify({'error': 'Missing name or amount'}), 400
+
+    current_user_id = g.user.id
+
+    try:
+        contribution = Contribution(name=name, amount=float(amount), savings_id=savings_id,
+                                    user_id=current_user_id)
+        contribution.validate()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    storage = DBStorage()
+    saved = storage.add_contribution(contribution)
+    if saved is None:
+        return jsonify({'error': 'Savings not found'}), 404
+    summary_cache.invalidate(current_user_id)
+
+    return jsonify(contribution=contribution.to_dict(), saved=saved), 201
+
+
+@app_views.route('/savings/<savings_id>/contributions', methods=['GET'])
+@jwt_required()
+def get_contributions(savings_id):
+    """
+    Get a page of a savings entry's contributions, newest first.
+
+    Pass the X-Next-Cursor header of a response as `before` to fetch the
+    next page.
+    """
+    current_user_id = g.user.id
+
+    try:
+        limit = parse_limit(request.args.get('limit'))
+        before = request.args.get('before')
+        before = decode_cursor(before) if before else None
+        fields = parse_fields(Contribution, request.args.get('fields'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    storage = DBStorage()
+    saving = storage.get(Savings, id=savings_id)
+    if not saving:
+        return jsonify({'error': 'Savings not found'}), 404
+
+    if saving.user_id != current_user_id:
+        return jsonify({'error': 'Unauthorized'}), 403
+
+    filters = [Contribution.savings_id == savings_id]
+    if before:
+        filters.append(or_(Contribution.created_at < before[0],
+                           and_(Contribution.created_at == before[0], Contribution.id < before[1])))
+    contributions = storage.by_user(Contribution, current_user_id, filters=filters,
+                                    order_by=[Contribution.created_at.desc(), Contribution.id.desc()],
+                                    limit=limit + 1, fields=fields)
+
+    response = jsonify([c.to_dict(fields) for c in contributions[:limit]])
+    if len(contributions) > limit:
+        edge = contributions[limit - 1]
+        response.headers['X-Next-Cursor'] = encode_cursor(edge.created_at, edge.id)
+    return response, 200
+
+
+@app_views.route('/savings/<savings_id>/contributions/<contribution_id>', methods=['DELETE'])
+@jwt_required()
+def delete_contribution(savings_id, contribution_id):
+    """Delete a contribution and take it off the savings entry's saved."""
+    current_user_id = g.user.id
+
+    storage = DBStorage()
+    contribution = storage.get(Contribution, id=contribution_id, savings_id=savings_id)
+    if not contribution:
+        return jsonify({'error': 'Contribution not found'}), 404
+
+    if contribution.user_id != current_user_id:
+        return jsonify({'error': 'Unauthorized'}), 403
+
+    saved = storage.remove_contribution(contribution)
+    if saved is None:
+        return jsonify({'error': 'Contribution not found'}), 404
+    summary_cache.invalidate(current_user_id)
+
+    return jsonify(saved=saved), 200
@@ -1,46 +1,155 @@
 #!/usr/bin/python3
 """Summary Management Routes."""
-from flask import request, jsonify
+from flask import g, request, jsonify
 from api.views import app_views
+from api.cache import summary_cache
+from api.columnar import response_format, to_columns, negotiated
+from api.conditional import user_etag, not_modified, set_validator
+from api.pagination import parse_date
 from models.engine.db_storage import DBStorage
-from models.transaction import Transaction
 from models.budget import Budget
 from models.savings import Savings
-from flask_jwt_extended import jwt_required, get_jwt_identity
-from datetime import datetime, timedelta
+from flask_jwt_extended import jwt_required
+from datetime import datetime, timedelta, timezone
+
+BUCKETS = ('day', 'week', 'month')
+MAX_BUCKETS = 1000
+SUMMARY_COLUMNS = {'budgets': ('name', 'amount', 'spent'), 'savings': ('name', 'goal', 'saved')}
+
+
+def align(day, bucket):
+    """Returns the first day of the bucket day falls in."""
+    if bucket == 'week':
+        return day - timedelta(days=day.weekday())
+    if bucket == 'month':
+        return day.replace(day=1)
+    return day
+
+
+def next_bucket(day, bucket):
+    """Returns the first day of the bucket after the one starting on day."""
+    if bucket == 'week':
+        return day + timedelta(weeks=1)
+    if bucket == 'month':
+        return (day.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return day + timedelta(days=1)
+
+
+def summary_response(summary, format, etag):
+    """Builds the response for a summary in the requested format."""
+    if format == 'columnar':
+        summary = dict(summary,
+                       budgets=to_columns(summary['budgets'], SUMMARY_COLUMNS['budgets']),
+                       savings=to_columns(summary['savings'], SUMMARY_COLUMNS['savings']))
+    return negotiated(set_validator(jsonify(summary), etag), format)
 
 
 @app_views.route('/summary', methods=['GET'])
 @jwt_required()
 def get_summary():
-    """Get the summary for the current user."""
-    current_user = get_jwt_identity()
-    current_user_id = current_user if isinstance(current_user, str) else current_user.get('userId')
+    """
+    Get the summary for the current user. The columnar format returns
+    the budgets and savings as one array per column.
+    """
+    current_user_id = g.user.id
+
+    try:
+        format = response_format()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
 
     storage = DBStorage()
+    version = storage.data_version(current_user_id)
+    etag = user_etag(current_user_id, format, version)
+    unchanged = not_modified(etag)
+    if unchanged:
+        unchanged.vary.add('Accept')
+        return unchanged
 
-    transactions = storage.all(Transaction).values()
-    user_transactions = [t for t in transactions if t.user_id == current_user_id]
+    cached = summary_cache.get(current_user_id, version)
+    if cached is not None:
+        response = summary_response(cached, format, etag)
+        response.headers['X-Cache'] = 'HIT'
+        return response, 200
 
-    total_income = sum(t.amount for t in user_transactions if t.type == 'income')
-    total_expenses = sum(t.amount for t in user_transactions if t.type == 'expense')
+    total_income, total_expenses = storage.totals(current_user_id)
     total_balance = total_income - total_expenses
 
-    budgets = storage.all(Budget).values()
-    user_budgets = [{"name": b.name, "amount": b.amount, "spent": b.spent} for b in budgets if b.user_id == current_user_id]
+    budgets = storage.by_user(Budget, current_user_id, order_by=Budget.created_at)
+    user_budgets = [{"name": b.name, "amount": b.amount, "spent": b.spent} for b in budgets]
 
-    savings = storage.all(Savings).values()
-    user_savings = [{"name": s.name, "goal": s.goal, "saved": s.saved} for s in savings if s.user_id == current_user_id]
+    savings = storage.by_user(Savings, current_user_id, order_by=Savings.created_at)
+    user_savings = [{"name": s.name, "goal": s.goal, "saved": s.saved} for s in savings]
 
-    income_transactions = [t for t in user_transactions if t.type == 'income']
-    expense_transactions = [t for t in user_transactions if t.type == 'expense']
-
-    return jsonify({
+    summary = {
         "total_income": total_income,
         "total_expenses": total_expenses,
         "total_balance": total_balance,
         "budgets": user_budgets,
-        "savings": user_savings,
-        "incomeTransactions": [{"amount": t.amount, "date": t.date.isoformat(), "type": t.type} for t in income_transactions],
-        "expenseTransactions": [{"amount": t.amount, "date": t.date.isoformat(), "type": t.type} for t in expense_transactions]
-    }), 200
+        "savings": user_savings
+    }
+    summary_cache.set(current_user_id, version, summary)
+
+    response = summary_response(summary, format, etag)
+    response.headers['X-Cache'] = 'MISS'
+    return response, 200
+
+
+@app_views.route('/summary/series', methods=['GET'])
+@jwt_required()
+def get_summary_series():
+    """
+    Get income and expense sums per day, week or month for charts.
+
+    `bucket` is day, week (starting on Monday) or month, `from` and `to`
+    are inclusive dates, `to` defaulting to today. Empty buckets are
+    filled with zeros unless `fill=0`. The arrays have one entry per
+    bucket, labelled with the bucket's first day.
+    """
+    current_user_id = g.user.id
+
+    bucket = request.args.get('bucket', 'day')
+    if bucket not in BUCKETS:
+        return jsonify({'error': 'bucket must be day, week or month'}), 400
+    try:
+        start = parse_date(request.args.get('from'))
+        end = parse_date(request.args.get('to'), end_of_day=True)
+    except ValueError:
+        return jsonify({'error': 'Invalid date'}), 400
+    if start is None:
+        return jsonify({'error': 'Missing from'}), 400
+    if end is None:
+        end = datetime.now(timezone.utc).replace(tzinfo=None, hour=0, minute=0,
+                                                  second=0, microsecond=0) + timedelta(days=1)
+    if end <= start:
+        return jsonify({'error': 'to must not be before from'}), 400
+    fill = request.args.get('fill', '1') != '0'
+
+    first = align(start.date(), bucket)
+    last = (end - timedelta(microseconds=1)).date()
+    if fill and (last - first).days >= MAX_BUCKETS * {'day': 1, 'week': 7, 'month': 28}[bucket]:
+        return jsonify({'error': f'Range spans more than {MAX_BUCKETS} buckets'}), 400
+
+    # `to` defaults to today, so the resolved end is part of the ETag.
+    etag = user_etag(current_user_id, end.isoformat())
+    unchanged = not_modified(etag)
+    if unchanged:
+        return unchanged
+
+    sums = DBStorage().series(current_user_id, bucket, start, end)
+    if fill:
+        days = []
+        day = first
+        while day <= last:
+            days.append(day)
+            day = next_bucket(day, bucket)
+    else:
+        days = sorted({day for day, _ in sums})
+
+    series = {
+        "bucket": bucket,
+        "labels": [day.isoformat() for day in days],
+        "income": [sums.get((day, 'income'), 0.0) for day in days],
+        "expenses": [sums.get((day, 'expense'), 0.0) for day in days],
+    }
+    return set_validator(jsonify(series), etag), 200
@@ -1,11 +1,31 @@
 #!/usr/bin/python3
 """Transactions Routes."""
-from flask import request, jsonify
+from flask import g, request, jsonify
+from sqlalchemy import and_, or_
 from api.views import app_views
+from api.cache import summary_cache
+from api.columnar import response_format, to_columns, negotiated
+from api.conditional import user_etag, not_modified, set_validator
+from api.pagination import parse_limit, parse_date, encode_cursor, decode_cursor
+from api.projection import columns, parse_fields
 from models.engine.db_storage import DBStorage
 from models.transaction import Transaction
-from models.user import User
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from flask_jwt_extended import jwt_required
+from datetime import datetime, timezone
+from os import getenv
+import csv
+import io
+import json
+import math
+import uuid
+
+BULK_BATCH_SIZE = int(getenv('SAND00G_BULK_BATCH_SIZE', '5000'))
+MAX_BULK_ERRORS = 1000
+BULK_FORMATS = {
+    'text/csv': 'csv',
+    'application/x-ndjson': 'ndjson',
+    'application/ndjson': 'ndjson',
+}
 
 @app_views.route('/transactions', methods=['POST'])
 @jwt_required()
@@ -23,13 +43,14 @@ def create_transaction():
     if not amount or not description or not type or not date:
         return jsonify({'error': 'Missing required fields'}), 400
 
-    current_user = get_jwt_identity()
-    current_user_id = current_user if isinstance(current_user, str) else current_user.get('userId')
+    current_user_id = g.user.id
 
     storage = DBStorage()
-    user = storage.get(User, id=current_user_id)
-    if not user:
-        return jsonify({'error': 'User not found'}), 404
+
+    try:
+        date = parse_date(date)
+    except ValueError:
+        return jsonify({'error': 'Invalid date'}), 400
 
     new_transaction = Transaction(amount=amount, description=description,
                                   type=type, user_id=current_user_id, date=date)
@@ -41,28 +62,181 @@ def create_transaction():
 
     storage.new(new_transaction)
     storage.save()
+    summary_cache.invalidate(current_user_id)
 
     return jsonify(new_transaction.to_dict()), 201
 
+def read_records(stream, format):
+    """Yields the records of a CSV or NDJSON body one at a time."""
+    text = io.TextIOWrapper(io.BufferedReader(stream), encoding='utf-8', newline='')
+    if format == 'csv':
+        yield from csv.DictReader(text)
+        return
+    for line in text:
+        if line.strip():
+            yield line
+
+
+def transaction_row(record, user_id, now):
+    """Validates one imported record and returns its column values."""
+    if isinstance(record, str):
+        record = json.loads(record)
+        if not isinstance(record, dict):
+            raise ValueError("Row must be an object")
+    missing = [key for key in ('amount', 'description', 'type', 'date')
+               if record.get(key) in (None, '')]
+    if missing:
+        raise ValueError(f"Missing {', '.join(missing)}")
+    try:
+        amount = float(record['amount'])
+    except (TypeError, ValueError):
+        raise ValueError("Invalid amount")
+    if not math.isfinite(amount):
+        raise ValueError("Invalid amount")
+    description = str(record['description'])
+    if len(description) > 128:
+        raise ValueError("Description is too long")
+    Transaction.validate_fields(amount, record['type'])
+    try:
+        date = parse_date(str(record['date']))
+    except ValueError:
+        raise ValueError("Invalid date")
+    return {'id': str(uuid.uuid4()), 'user_id': user_id, 'amount': amount,
+            'description': description, 'type': record['type'], 'date': date,
+            'created_at': now, 'updated_at': now}
+
+
+@app_views.route('/transactions/bulk', methods=['POST'])
+@jwt_required()
+def import_transactions():
+    """
+    Import transactions from a CSV or NDJSON body.
+
+    The body is parsed as it streams in and valid rows are inserted in
+    batches of BULK_BATCH_SIZE, each committed on its own. Invalid rows
+    are skipped and reported with their row number.
+    """
+    format = request.args.get('format') or BULK_FORMATS.get(request.mimetype)
+    if format not in ('csv', 'ndjson'):
+        return jsonify({'error': 'Body must be CSV or NDJSON'}), 415
+
+    current_user_id = g.user.id
+
+    storage = DBStorage()
+
+    now = datetime.now(timezone.utc)
+    inserted = 0
+    failed = 0
+    errors = []
+    batch = []
+    try:
+        for number, record in enumerate(read_records(request.stream, format), start=1):
+            try:
+                batch.append(transaction_row(record, current_user_id, now))
+            except ValueError as e:
+                failed += 1
+                if len(errors) < MAX_BULK_ERRORS:
+                    errors.append({'row': number, 'error': str(e)})
+                continue
+            if len(batch) >= BULK_BATCH_SIZE:
+                storage.add_transactions(current_user_id, batch)
+                inserted += len(batch)
+                batch = []
+        storage.add_transactions(current_user_id, batch)
+        inserted += len(batch)
+    except (UnicodeDecodeError, csv.Error) as e:
+        return jsonify({'error': f'Unreadable body: {e}', 'inserted': inserted}), 400
+    finally:
+        if inserted:
+            summary_cache.invalidate(current_user_id)
+
+    return jsonify({'inserted': inserted, 'failed': failed, 'errors': errors}), 200
+
+
 @app_views.route('/transactions', methods=['GET'])
 @jwt_required()
 def get_user_transactions():
-    """Get all transactions for the current user."""
-    current_user = get_jwt_identity()
-    current_user_id = current_user if isinstance(current_user, str) else current_user.get('userId')
+    """
+    Get a page of transactions for the current user, newest first.
+
+    Pages are keyed on (date, id): pass the X-Next-Cursor header of a
+    response as `before` to fetch older rows, or a cursor as `after` to
+    fetch newer ones. `from`, `to` and `type` narrow the results, and
+    `fields` lists the columns to return. The columnar format returns one
+    array per column instead of one object per row.
+    """
+    current_user_id = g.user.id
+
+    try:
+        limit = parse_limit(request.args.get('limit'))
+        date_from = parse_date(request.args.get('from'))
+        date_to = parse_date(request.args.get('to'), end_of_day=True)
+        before = request.args.get('before')
+        after = request.args.get('after')
+        before = decode_cursor(before) if before else None
+        after = decode_cursor(after) if after else None
+        fields = parse_fields(Transaction, request.args.get('fields'))
+        format = response_format()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    if before and after:
+        return jsonify({'error': 'Use either before or after, not both'}), 400
+
+    type = request.args.get('type')
+    if type and type not in ('income', 'expense'):
+        return jsonify({'error': 'Invalid type'}), 400
+
+    filters = []
+    if date_from:
+        filters.append(Transaction.date >= date_from)
+    if date_to:
+        filters.append(Transaction.date < date_to)
+    if type:
+        filters.append(Transaction.type == type)
+    if before:
+        filters.append(or_(Transaction.date < before[0],
+                           and_(Transaction.date == before[0], Transaction.id < before[1])))
+        order_by = [Transaction.date.desc(), Transaction.id.desc()]
+    elif after:
+        filters.append(or_(Transaction.date > after[0],
+                           and_(Transaction.date == after[0], Transaction.id > after[1])))
+        order_by = [Transaction.date.asc(), Transaction.id.asc()]
+    else:
+        order_by = [Transaction.date.desc(), Transaction.id.desc()]
+
+    etag = user_etag(current_user_id, format)
+    unchanged = not_modified(etag)
+    if unchanged:
+        unchanged.vary.add('Accept')
+        return unchanged
 
     storage = DBStorage()
-    transactions = storage.all(Transaction).values()
-    user_transactions = [t.to_dict() for t in transactions if t.user_id == current_user_id]
+    transactions = storage.by_user(Transaction, current_user_id, filters=filters,
+                                   order_by=order_by, limit=limit + 1, fields=fields)
+    has_more = len(transactions) > limit
+    transactions = transactions[:limit]
+
+    next_cursor = None
+    if has_more:
+        edge = transactions[-1]
+        next_cursor = encode_cursor(edge.date, edge.id)
+    if after:
+        transactions.reverse()
 
-    return jsonify(user_transactions), 200
+    rows = [t.to_dict(fields) for t in transactions]
+    if format == 'columnar':
+        rows = to_columns(rows, columns(Transaction, fields))
+    response = negotiated(set_validator(jsonify(rows), etag), format)
+    if next_cursor:
+        response.headers['X-Next-Cursor'] = next_cursor
+    return response, 200
 
 @app_views.route('/transactions/<transaction_id>', methods=['DELETE'])
 @jwt_required()
 def delete_transaction(transaction_id):
     """Delete a specific transaction."""
-    current_user = get_jwt_identity()
-    current_user_id = current_user.get('userId')
+    current_user_id = g.user.id
     
     storage = DBStorage()
     transaction = storage.get(Transaction, id=transaction_id)
@@ -75,5 +249,6 @@ def delete_transaction(transaction_id):
     
     storage.delete(transaction)
     storage.save()
+    summary_cache.invalidate(current_user_id)
     
     return jsonify({'message': 'Transaction deleted successfully'}), 200
@@ -1,7 +1,9 @@
 #!/usr/bin/python3
 """User Authentication Routes."""
-from flask import request, jsonify
-from api.views import app_views
+from flask import g, request, jsonify
+from api.views import app_views, read_only
+from api.guest_pool import claim_guest
+from api.identity import forget_users
 from models.engine.db_storage import DBStorage
 from models.user import User
 from models.budget import Budget
@@ -73,8 +75,11 @@ def login():
 
     storage = DBStorage()
     user = storage.get(User, username=username)
+    pwhash = user.password if user else None
     if not user or not user.check_password(password):
         return jsonify({'error': 'Invalid username or password'}), 400
+    if user.password != pwhash:
+        storage.save()
 
     access_token = create_access_token(identity={'userId': user.id, 'username': user.username})
     refresh_token = create_refresh_token(identity={'userId': user.id, 'username': user.username})
@@ -84,6 +89,11 @@ def login():
 @app_views.route('/guest_session', methods=['POST'])
 def guest_session():
     """Create a guest session."""
+    guest_user = claim_guest()
+    if guest_user:
+        access_token = create_access_token(identity={'userId': guest_user.id, 'username': guest_user.username})
+        return jsonify(user=guest_user.to_dict(), access_token=access_token), 201
+
     guest_username = f'guest_{uuid.uuid4()}'
     guest_password = 'guest_password'
     guest_user = User(username=guest_username, password=guest_password, is_guest=True)
@@ -111,12 +121,11 @@ def guest_session():
 @jwt_required()
 def delete_user(user_id):
     """Delete a user by id."""
-    current_user = get_jwt_identity()
-    if current_user['userId'] != user_id:
+    if g.user.id != user_id:
         return jsonify({'error': 'Unauthorized action'}), 403
 
     storage = DBStorage()
-    user = storage.get(User, user_id)
+    user = storage.get(User, id=user_id)
     if not user:
         return jsonify({'error': 'User not found'}), 404
 
@@ -125,10 +134,12 @@ def delete_user(user_id):
 
     storage.delete(user)
     storage.save()
+    forget_users([user_id])
     return jsonify({}), 204
 
 
 @app_views.route('/check_user', methods=['POST'])
+@read_only
 def check_user():
     """Check if a user exists."""
     data = request.get_json()
@@ -150,5 +161,5 @@ def refresh():
     """Refresh the access token using the refresh token."""
     current_user = get_jwt_identity()
     access_token = create_access_token(identity=current_user)
-    is_guest = current_user.get('is_guest', False)
+    is_guest = g.user.is_guest
     return jsonify(access_token=access_token, is_guest=is_guest), 200
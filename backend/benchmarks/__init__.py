@@ -0,0 +1,8 @@
+#!/usr/bin/python3
+"""
+Benchmarks for the Sandoog backend.
+
+serialize_bench measures model serialization alone; load seeds a local
+database and drives the Flask app through a mix of API calls; compare
+flags regressions between two load reports.
+"""
@@ -0,0 +1,81 @@
+#!/usr/bin/python3
+"""
+Compares two benchmarks.load reports and flags regressions.
+
+An endpoint regresses when a latency percentile grows by more than
+--threshold (relative) and --min-ms (absolute), when it runs more SQL
+statements per request, or when it starts returning errors. Run from
+the backend directory:
+
+    python -m benchmarks.compare base.json run.json [--threshold 0.1] [--min-ms 1]
+
+Exits with status 1 when anything regressed.
+"""
+import argparse
+import json
+import sys
+
+METRICS = ('p50_ms', 'p95_ms', 'p99_ms')
+
+
+def compare(base, run, threshold, min_ms):
+    """Returns (rows, regressions) comparing the endpoints found in both reports."""
+    rows, regressions = [], []
+    for name, new in run['endpoints'].items():
+        old = base['endpoints'].get(name)
+        if old is None:
+            continue
+        for metric in METRICS:
+            before, after = old[metric], new[metric]
+            change = (after - before) / before if before else 0.0
+            regressed = change > threshold and after - before > min_ms
+            rows.append((name, metric, before, after, change, regressed))
+            if regressed:
+                regressions.append(f'{name} {metric} {before} -> {after} ms ({change:+.0%})')
+        if new['sql_per_request'] > old['sql_per_request']:
+            regressions.append(f"{name} sql_per_request {old['sql_per_request']} -> "
+                               f"{new['sql_per_request']}")
+        if new['errors'] and not old['errors']:
+            regressions.append(f"{name} errors 0 -> {new['errors']}")
+    return rows, regressions
+
+
+def main(argv=None):
+    """Prints the comparison and exits with 1 on regressions."""
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('base')
+    parser.add_argument('run')
+    parser.add_argument('--threshold', type=float, default=0.10,
+                        help='relative latency growth to flag (default 0.10)')
+    parser.add_argument('--min-ms', type=float, default=1.0,
+                        help='absolute latency growth to flag (default 1 ms)')
+    parser.add_argument('--json', action='store_true', help='print the result as JSON')
+    args = parser.parse_args(argv)
+
+    with open(args.base) as handle:
+        base = json.load(handle)
+    with open(args.run) as handle:
+        run = json.load(handle)
+    rows, regressions = compare(base, run, args.threshold, args.min_ms)
+
+    if args.json:
+        print(json.dumps({
+            'base': base['meta'].get('git_revision'),
+            'run': run['meta'].get('git_revision'),
+            'throughput_rps': [base['total']['throughput_rps'], run['total']['throughput_rps']],
+            'regressions': regressions,
+        }, indent=2))
+    else:
+        print(f"{'endpoint':<20} {'metric':<7} {'base':>10} {'run':>10} {'change':>8}")
+        for name, metric, before, after, change, regressed in rows:
+            print(f"{name:<20} {metric:<7} {before:>10.3f} {after:>10.3f} {change:>+8.0%}"
+                  + ('  REGRESSION' if regressed else ''))
+        print(f"throughput {base['total']['throughput_rps']} -> "
+              f"{run['total']['throughput_rps']} req/s")
+        for regression in regressions:
+            print('regressed:', regression)
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
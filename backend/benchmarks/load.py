@@ -0,0 +1,274 @@
+#!/usr/bin/python3
+"""
+Load and latency benchmark for the API.
+
+Seeds a local database, then drives api.app in-process from several
+threads through a weighted mix of API calls, and writes a JSON report
+with the throughput, p50/p95/p99 latency and SQL statements per request
+of each endpoint. Run from the backend directory:
+
+    python -m benchmarks.load --users 50 --transactions 2000 --out run.json
+    python -m benchmarks.compare base.json run.json
+
+The default database is a SQLite file in the temporary directory,
+recreated on every run; --db points it at another database, which
+--reset empties first.
+"""
+import argparse
+import itertools
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+
+DEFAULT_MIX = {
+    'register': 1, 'login': 2,
+    'list_transactions': 25, 'list_budgets': 8, 'list_savings': 8,
+    'list_expenses': 5, 'summary': 15, 'summary_series': 10,
+    'add_transaction': 12, 'add_expense': 6, 'add_contribution': 4,
+}
+PERCENTILES = (50, 95, 99)
+
+
+def operations():
+    """Returns the benchmarked calls by name; each takes (client, user, rng, headers)."""
+    from benchmarks.seed import PASSWORD
+    # Warmup and measured workers replay the same random streams, so new
+    # usernames come from a counter shared by every worker instead.
+    registered = itertools.count()
+
+    def register(client, user, rng, headers):
+        username = f"{user['username']}-new-{next(registered)}"
+        return client.post('/api/register', json={'username': username, 'password': PASSWORD})
+
+    def login(client, user, rng, headers):
+        return client.post('/api/login', json={'username': user['username'], 'password': PASSWORD})
+
+    def list_transactions(client, user, rng, headers):
+        return client.get('/api/transactions?limit=100', headers=headers)
+
+    def list_budgets(client, user, rng, headers):
+        return client.get('/api/budgets', headers=headers)
+
+    def list_savings(client, user, rng, headers):
+        return client.get('/api/savings', headers=headers)
+
+    def list_expenses(client, user, rng, headers):
+        return client.get(f"/api/budgets/{rng.choice(user['budgets'])}/expenses", headers=headers)
+
+    def summary(client, user, rng, headers):
+        return client.get('/api/summary', headers=headers)
+
+    def summary_series(client, user, rng, headers):
+        start = (date.today() - timedelta(days=365)).isoformat()
+        return client.get(f'/api/summary/series?bucket=month&from={start}', headers=headers)
+
+    def add_transaction(client, user, rng, headers):
+        return client.post('/api/transactions', headers=headers, json={
+            'amount': round(rng.uniform(1, 300), 2), 'description': 'Benchmark',
+            'type': rng.choice(('income', 'expense')), 'date': date.today().isoformat()})
+
+    def add_expense(client, user, rng, headers):
+        return client.post(f"/api/budgets/{rng.choice(user['budgets'])}/expenses", headers=headers,
+                           json={'name': 'Benchmark', 'amount': round(rng.uniform(1, 50), 2)})
+
+    def add_contribution(client, user, rng, headers):
+        return client.post(f"/api/savings/{rng.choice(user['savings'])}/contributions",
+                           headers=headers,
+                           json={'name': 'Benchmark', 'amount': round(rng.uniform(1, 50), 2)})
+
+    return {name: function for name, function in locals().items() if callable(function)}
+
+
+def parse_mix(value):
+    """Parses name=weight,... into a mix, starting from DEFAULT_MIX."""
+    mix = dict(DEFAULT_MIX)
+    for item in filter(None, (value or '').split(',')):
+        name, _, weight = item.partition('=')
+        if name not in DEFAULT_MIX:
+            raise argparse.ArgumentTypeError(f'unknown operation {name}')
+        mix[name] = int(weight)
+    return {name: weight for name, weight in mix.items() if weight > 0}
+
+
+def percentile(ordered, p):
+    """Nearest-rank percentile of an ordered list."""
+    if not ordered:
+        return None
+    return ordered[max(0, -(-len(ordered) * p // 100) - 1)]
+
+
+def prepare_database(url, reset):
+    """Points the app at url and brings its schema to the head revision."""
+    os.environ['SAND00G_DB_URL'] = url
+    from sqlalchemy.engine import make_url
+    from models.engine.db_storage import DBStorage
+    database = make_url(url).database
+    if reset and make_url(url).get_backend_name() == 'sqlite' and database:
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(database + suffix):
+                os.remove(database + suffix)
+    storage = DBStorage()
+    if reset and storage.schema_revision() is not None:
+        storage.migrate('downgrade', 'base')
+    storage.migrate('upgrade', 'head')
+    return storage
+
+
+def git_revision():
+    """Returns the checked out commit, or None outside a git work tree."""
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(args):
+    """Seeds, drives the app and returns the report."""
+    os.environ.setdefault('JWT_SECRET_KEY', 'benchmark')
+    os.environ.setdefault('SAND00G_LOG_LEVEL', 'WARNING')
+    os.environ['SAND00G_GUEST_POOL_SIZE'] = '0'
+    prepare_database(args.db, args.reset)
+
+    from sqlalchemy import create_engine, event
+    from sqlalchemy.engine import Engine
+    from flask_jwt_extended import create_access_token
+    from benchmarks.seed import seed
+    from models.engine.db_storage import database_url
+    from api.app import app, scheduler
+
+    rng = random.Random(args.seed)
+    started = time.perf_counter()
+    engine = create_engine(database_url())
+    users = seed(engine, f'bench-{args.seed}-{int(time.time())}', args.users,
+                 args.transactions, rng)
+    engine.dispose()
+    seeded = time.perf_counter() - started
+    with app.app_context():
+        for user in users:
+            user['headers'] = {'Authorization': 'Bearer ' + create_access_token(
+                identity={'userId': user['id'], 'username': user['username']})}
+
+    local = threading.local()
+
+    def count_statement(*args):
+        local.statements = getattr(local, 'statements', 0) + 1
+    event.listen(Engine, 'before_cursor_execute', count_statement)
+
+    calls = operations()
+    names = list(args.mix)
+    weights = [args.mix[name] for name in names]
+    samples = {name: [] for name in names}
+    lock = threading.Lock()
+
+    def worker(index, requests, record):
+        worker_rng = random.Random(args.seed * 1000 + index)
+        client = app.test_client()
+        mine = {name: [] for name in names}
+        for _ in range(requests):
+            name = worker_rng.choices(names, weights)[0]
+            user = worker_rng.choice(users)
+            local.statements = 0
+            began = time.perf_counter()
+            response = calls[name](client, user, worker_rng, user['headers'])
+            elapsed = time.perf_counter() - began
+            mine[name].append((elapsed, local.statements, response.status_code))
+        if record:
+            with lock:
+                for name, values in mine.items():
+                    samples[name].extend(values)
+
+    def drive(total, record):
+        threads = [threading.Thread(target=worker, args=(
+            i, total // args.concurrency + (i < total % args.concurrency), record))
+            for i in range(args.concurrency)]
+        began = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return time.perf_counter() - began
+
+    drive(args.warmup, record=False)
+    wall = drive(args.requests, record=True)
+    event.remove(Engine, 'before_cursor_execute', count_statement)
+    scheduler.shutdown(wait=False)
+
+    endpoints = {}
+    for name, values in samples.items():
+        if not values:
+            continue
+        latencies = sorted(v[0] * 1000 for v in values)
+        endpoints[name] = {
+            'count': len(values),
+            'errors': sum(1 for v in values if v[2] >= 400),
+            'throughput_rps': round(len(values) / wall, 2),
+            'mean_ms': round(sum(latencies) / len(latencies), 3),
+            **{f'p{p}_ms': round(percentile(latencies, p), 3) for p in PERCENTILES},
+            'sql_per_request': round(sum(v[1] for v in values) / len(values), 2),
+        }
+    everything = sorted(v[0] * 1000 for values in samples.values() for v in values)
+    return {
+        'meta': {
+            'git_revision': git_revision(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'database': engine.dialect.name,
+            'users': args.users, 'transactions_per_user': args.transactions,
+            'requests': args.requests, 'warmup': args.warmup,
+            'concurrency': args.concurrency, 'seed': args.seed, 'mix': args.mix,
+            'seed_seconds': round(seeded, 2), 'wall_seconds': round(wall, 3),
+        },
+        'total': {
+            'count': len(everything),
+            'errors': sum(e['errors'] for e in endpoints.values()),
+            'throughput_rps': round(len(everything) / wall, 2),
+            **{f'p{p}_ms': round(percentile(everything, p), 3) for p in PERCENTILES},
+        },
+        'endpoints': endpoints,
+    }
+
+
+def main(argv=None):
+    """Parses the command line, runs the benchmark and writes the report."""
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--db', help='database URL (default: a fresh SQLite file)')
+    parser.add_argument('--reset', action='store_true',
+                        help='empty the --db database before seeding')
+    parser.add_argument('--users', type=int, default=20)
+    parser.add_argument('--transactions', type=int, default=1000,
+                        help='mean transactions per user')
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--warmup', type=int, default=100)
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--mix', type=parse_mix, default=dict(DEFAULT_MIX),
+                        help='weights as name=weight,... over the default mix')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--out', help='write the JSON report here instead of stdout')
+    args = parser.parse_args(argv)
+    if args.db is None:
+        args.db = 'sqlite:///' + os.path.join(tempfile.gettempdir(), 'sandoog-bench.db')
+        args.reset = True
+
+    report = run(args)
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, 'w') as handle:
+            handle.write(text + '\n')
+        total = report['total']
+        print(f"{total['count']} requests, {total['throughput_rps']} req/s, "
+              f"p95 {total['p95_ms']} ms, {total['errors']} error(s) -> {args.out}",
+              file=sys.stderr)
+    else:
+        print(text)
+
+
+if __name__ == '__main__':
+    main()
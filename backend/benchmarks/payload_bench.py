@@ -0,0 +1,71 @@
+#!/usr/bin/python3
+"""
+Payload-size benchmark for list responses.
+
+Serializes ROWS transactions the way GET /transactions does, in the row
+and columnar formats, with every column and with a `fields` projection,
+and reports the body size and encoding time raw and under each
+compression the API can negotiate (gzip, plus br and zstd when brotli
+and zstandard are installed). Run from the backend directory:
+
+    python -m benchmarks.payload_bench [ROWS]
+"""
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from flask import Flask
+from api.columnar import to_columns
+from api.compression import ENCODERS
+from api.json_provider import json_provider_class
+from api.projection import columns
+from models.transaction import Transaction
+import models.user  # noqa: F401, configures the Transaction.user relationship
+
+ROWS = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+FIELDS = ('amount', 'date', 'type')
+
+
+def transactions():
+    """Builds ROWS transactions of one user."""
+    now = datetime.now(timezone.utc)
+    return [Transaction(amount=i % 500 + 0.5, description=f'transaction {i}',
+                        type=('income', 'expense')[i % 2], user_id='bench',
+                        date=now - timedelta(minutes=i), id=str(uuid.uuid4()))
+            for i in range(ROWS)]
+
+
+def encode(provider, rows, format, fields):
+    """Returns the JSON body of rows in format and the time it took."""
+    started = time.perf_counter()
+    body = [t.to_dict(fields) for t in rows]
+    if format == 'columnar':
+        body = to_columns(body, columns(Transaction, fields))
+    data = provider.dumps(body).encode()
+    return data, time.perf_counter() - started
+
+
+def main():
+    """Prints one line per format, projection and encoding."""
+    provider = json_provider_class()(Flask(__name__))
+    rows = transactions()
+    missing = [name for name in ('zstd', 'br') if name not in ENCODERS]
+    if missing:
+        print(f'{" and ".join(missing)} not available; install zstandard or brotli to compare.')
+    print(f'{f"{ROWS} transactions":<28}{"encoding":<10}{"body":>10}{"vs rows":>9}{"time":>10}')
+    baseline = {}
+    for fields in (None, FIELDS):
+        for format in ('rows', 'columnar'):
+            data, elapsed = encode(provider, rows, format, fields)
+            name = f'{format}, {"fields" if fields else "all columns"}'
+            for encoding, compress in [('identity', None)] + list(ENCODERS.items()):
+                started = time.perf_counter()
+                body = compress(data) if compress else data
+                total = elapsed + time.perf_counter() - started
+                reference = baseline.setdefault((fields, encoding), len(body))
+                print(f'{name:<28}{encoding:<10}{len(body) / 1e3:>8.1f}KB'
+                      f'{len(body) / reference:>8.0%}{total * 1000:>8.2f}ms')
+
+
+if __name__ == '__main__':
+    main()
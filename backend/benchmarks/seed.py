@@ -0,0 +1,97 @@
+#!/usr/bin/python3
+"""Seeds a database with users holding realistic volumes of data."""
+import uuid
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import insert
+from models.budget import Budget
+from models.contribution import Contribution
+from models.expense import Expense
+from models.hashing import hash_password
+from models.savings import Savings
+from models.transaction import Transaction
+from models.user import User
+from models.user_totals import UserTotals
+
+PASSWORD = 'bench-password'
+BUDGET_NAMES = ('Groceries', 'Rent', 'Transportation', 'Entertainment', 'Health', 'Gifts')
+SAVINGS_NAMES = ('Emergency', 'Travel', 'Car', 'Investments')
+DESCRIPTIONS = ('Salary', 'Freelance', 'Groceries', 'Fuel', 'Restaurant', 'Rent',
+                'Electricity', 'Cinema', 'Pharmacy', 'Books')
+
+
+def seed(engine, prefix, users, transactions, rng, days=365, batch_size=5000):
+    """
+    Inserts users with about transactions transactions each, spread over
+    the last days days, plus budgets with expenses and savings with
+    contributions. Returns a dict per user created with its id, username
+    and the ids of its budgets and savings.
+
+    Every user's password is PASSWORD.
+    """
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    password = hash_password(PASSWORD)
+    created = []
+    # In insertion order, parents first so foreign keys hold.
+    rows = {cls: [] for cls in (User, UserTotals, Budget, Savings, Expense,
+                                 Contribution, Transaction)}
+
+    def row(cls, **values):
+        values.setdefault('id', str(uuid.uuid4()))
+        values.setdefault('created_at', now)
+        values.setdefault('updated_at', now)
+        rows[cls].append(values)
+        return values['id']
+
+    def flush(connection):
+        for cls, pending in rows.items():
+            if pending:
+                connection.execute(insert(cls.__table__), pending)
+                pending.clear()
+
+    with engine.begin() as connection:
+        for i in range(users):
+            username = f'{prefix}-{i}'
+            user_id = row(User, username=username, password=password, role='user',
+                          is_guest=False, last_activity=now, data_version=0)
+            user = {'id': user_id, 'username': username, 'budgets': [], 'savings': []}
+            created.append(user)
+            count = max(1, int(rng.gauss(transactions, transactions / 4)))
+            income = expenses = 0.0
+            for _ in range(count):
+                type = 'income' if rng.random() < 0.3 else 'expense'
+                amount = round(rng.lognormvariate(3.5, 1.0), 2)
+                if type == 'income':
+                    income += amount
+                else:
+                    expenses += amount
+                row(Transaction, user_id=user_id, type=type, amount=amount,
+                    description=rng.choice(DESCRIPTIONS),
+                    date=now - timedelta(minutes=rng.randrange(days * 24 * 60)))
+            rows[UserTotals].append({'user_id': user_id, 'total_income': income,
+                                     'total_expenses': expenses})
+            for name in rng.sample(BUDGET_NAMES, 4):
+                spent = 0.0
+                budget_id = str(uuid.uuid4())
+                for _ in range(rng.randrange(0, 20)):
+                    amount = round(rng.uniform(5, 80), 2)
+                    spent += amount
+                    row(Expense, name=rng.choice(DESCRIPTIONS), amount=amount,
+                        budget_id=budget_id, user_id=user_id)
+                user['budgets'].append(budget_id)
+                row(Budget, id=budget_id, name=name, amount=rng.choice((200.0, 500.0, 1000.0)),
+                    spent=spent, user_id=user_id)
+            for name in rng.sample(SAVINGS_NAMES, 3):
+                saved = 0.0
+                savings_id = str(uuid.uuid4())
+                for _ in range(rng.randrange(0, 12)):
+                    amount = round(rng.uniform(20, 200), 2)
+                    saved += amount
+                    row(Contribution, name='Deposit', amount=amount,
+                        savings_id=savings_id, user_id=user_id)
+                user['savings'].append(savings_id)
+                row(Savings, id=savings_id, name=name, goal=rng.choice((1000.0, 3000.0, 10000.0)),
+                    saved=saved, user_id=user_id)
+            if len(rows[Transaction]) >= batch_size:
+                flush(connection)
+        flush(connection)
+    return created
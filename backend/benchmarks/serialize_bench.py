@@ -0,0 +1,95 @@
+#!/usr/bin/python3
+"""
+Micro-benchmark for model serialization.
+
+Loads ROWS transactions from an in-memory SQLite database and reports
+rows per second for the old __dict__ based to_dict with Flask's
+default encoder against the generated serializer, with and without
+orjson and a field projection. "total" includes loading the rows,
+"encode" is to_dict plus JSON encoding alone. Run from the backend
+directory:
+
+    python -m benchmarks.serialize_bench [ROWS]
+"""
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import Session, load_only
+from api.json_provider import JSONProvider, OrjsonProvider, orjson
+from models.base_model import serializer
+from models.transaction import Transaction
+import models.user  # noqa: F401, configures the Transaction.user relationship
+
+ROWS = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+FIELDS = ('amount', 'date', 'type')
+
+
+def legacy_to_dict(obj):
+    """The to_dict this benchmark compares against."""
+    my_dict = obj.__dict__.copy()
+    my_dict['__class__'] = obj.__class__.__name__
+    my_dict['created_at'] = obj.created_at.isoformat()
+    my_dict['updated_at'] = obj.updated_at.isoformat()
+    if '_sa_instance_state' in my_dict:
+        del my_dict['_sa_instance_state']
+    return my_dict
+
+
+def seed(engine):
+    """Creates the transactions table and fills it with ROWS rows."""
+    Transaction.__table__.create(engine)
+    now = datetime.now(timezone.utc)
+    rows = [{'id': str(uuid.uuid4()), 'user_id': 'bench', 'amount': i % 500 + 0.5,
+             'description': f'transaction {i}', 'type': ('income', 'expense')[i % 2],
+             'date': now - timedelta(minutes=i), 'created_at': now, 'updated_at': now}
+            for i in range(ROWS)]
+    with engine.begin() as connection:
+        connection.execute(insert(Transaction), rows)
+
+
+def run(engine, provider, to_dict, fields=None):
+    """
+    Loads every row, serializes it and encodes the list. Returns the
+    total and encode rates in rows/s and the body size.
+    """
+    started = time.perf_counter()
+    with Session(engine) as session:
+        query = session.query(Transaction)
+        if fields:
+            query = query.options(load_only(*[getattr(Transaction, name) for name in fields]))
+        rows = query.all()
+        loaded = time.perf_counter()
+        body = provider.dumps([to_dict(t) for t in rows])
+    finished = time.perf_counter()
+    return ROWS / (finished - started), ROWS / (finished - loaded), len(body)
+
+
+def main():
+    """Prints one line per configuration."""
+    engine = create_engine('sqlite://')
+    seed(engine)
+    app = Flask(__name__)
+    flask_default = DefaultJSONProvider(app)
+    stdlib = JSONProvider(app)
+    cases = [('legacy to_dict + flask default', flask_default, legacy_to_dict, None),
+             ('serializer + stdlib', stdlib, serializer(Transaction), None),
+             ('serializer + stdlib, fields', stdlib, serializer(Transaction, FIELDS), FIELDS)]
+    if orjson is not None:
+        fast = OrjsonProvider(app)
+        cases += [('serializer + orjson', fast, serializer(Transaction), None),
+                  ('serializer + orjson, fields', fast, serializer(Transaction, FIELDS), FIELDS)]
+    else:
+        print('orjson is not installed; skipping the orjson cases.')
+    run(engine, stdlib, legacy_to_dict)
+    print(f'{ROWS} transactions{"":<20}{"total":>12}{"encode":>12}{"body":>10}')
+    for name, provider, to_dict, fields in cases:
+        total, encode, size = run(engine, provider, to_dict, fields)
+        print(f'{name:<34} {total:>10,.0f}/s {encode:>10,.0f}/s {size / 1e6:>7.2f} MB')
+
+
+if __name__ == '__main__':
+    main()
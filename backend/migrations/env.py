@@ -0,0 +1,16 @@
+"""Alembic environment for the Sandoog schema.
+
+Migrations run over the connection DBStorage passes in the config
+attributes; see DBStorage.migrate().
+"""
+from alembic import context
+from models.base_model import Base
+import models.engine.db_storage  # noqa: F401, imports every model
+
+context.configure(connection=context.config.attributes['connection'],
+                  target_metadata=Base.metadata,
+                  render_as_batch=True,
+                  compare_type=True)
+
+with context.begin_transaction():
+    context.run_migrations()
@@ -0,0 +1,66 @@
+"""Baseline schema: users, transactions, budgets and savings.
+
+Revision ID: 0001
+Revises:
+Create Date: 2024-08-01 00:00:00
+
+Databases created by create_all before migrations existed already have
+these tables; mark them with `flask --app api.app db stamp 0001` and
+upgrade from there.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0001'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def base_columns():
+    """Returns the columns every BaseModel table has."""
+    return [sa.Column('id', sa.String(60), primary_key=True, nullable=False),
+            sa.Column('created_at', sa.DateTime(), nullable=False),
+            sa.Column('updated_at', sa.DateTime(), nullable=False)]
+
+
+def upgrade():
+    op.create_table(
+        'users', *base_columns(),
+        sa.Column('username', sa.String(80), nullable=False, unique=True),
+        sa.Column('password', sa.String(255), nullable=False),
+        sa.Column('role', sa.String(50), nullable=False),
+        sa.Column('is_guest', sa.Boolean()),
+        sa.Column('last_activity', sa.DateTime()))
+    op.create_table(
+        'transactions', *base_columns(),
+        sa.Column('amount', sa.Float(), nullable=False),
+        sa.Column('description', sa.String(128), nullable=False),
+        sa.Column('type', sa.Enum('income', 'expense', name='transaction_type'),
+                  nullable=False),
+        sa.Column('user_id', sa.String(60), sa.ForeignKey('users.id'), nullable=False),
+        sa.Column('date', sa.DateTime(), nullable=False))
+    op.create_index('ix_transactions_user_id', 'transactions', ['user_id'])
+    op.create_table(
+        'budgets', *base_columns(),
+        sa.Column('name', sa.String(128), nullable=False),
+        sa.Column('amount', sa.Float(), nullable=False),
+        sa.Column('spent', sa.Float(), nullable=False),
+        sa.Column('expenses', sa.JSON()),
+        sa.Column('user_id', sa.String(60), sa.ForeignKey('users.id'), nullable=False))
+    op.create_index('ix_budgets_user_id', 'budgets', ['user_id'])
+    op.create_table(
+        'savings', *base_columns(),
+        sa.Column('name', sa.String(128), nullable=False),
+        sa.Column('goal', sa.Float(), nullable=False),
+        sa.Column('saved', sa.Float(), nullable=False),
+        sa.Column('contributions', sa.JSON()),
+        sa.Column('user_id', sa.String(60), sa.ForeignKey('users.id'), nullable=False))
+    op.create_index('ix_savings_user_id', 'savings', ['user_id'])
+
+
+def downgrade():
+    op.drop_table('savings')
+    op.drop_table('budgets')
+    op.drop_table('transactions')
+    op.drop_table('users')
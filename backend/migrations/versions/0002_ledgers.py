@@ -0,0 +1,107 @@
+"""Ledger tables: user_totals, expenses and contributions.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2024-08-01 00:00:01
+
+Moves the budgets.expenses and savings.contributions JSON lists into
+rows, fills user_totals from the transactions and adds the
+users.data_version change counter.
+"""
+from alembic import op
+import sqlalchemy as sa
+import uuid
+
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+LEDGERS = (
+    # (table, parent table, parent key, legacy JSON column)
+    ('expenses', 'budgets', 'budget_id', 'expenses'),
+    ('contributions', 'savings', 'savings_id', 'contributions'),
+)
+
+
+def create_ledger(name, parent, parent_key):
+    """Creates an expenses-like table of rows owned by a parent row."""
+    op.create_table(
+        name,
+        sa.Column('id', sa.String(60), primary_key=True, nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.Column('name', sa.String(128), nullable=False),
+        sa.Column('amount', sa.Float(), nullable=False),
+        sa.Column(parent_key, sa.String(60),
+                  sa.ForeignKey(f'{parent}.id', ondelete='CASCADE'), nullable=False),
+        sa.Column('user_id', sa.String(60), sa.ForeignKey('users.id'), nullable=False))
+    op.create_index(f'ix_{name}_{parent_key[:-len("_id")]}_created_id', name,
+                    [parent_key, 'created_at', 'id'])
+    op.create_index(f'ix_{name}_user_id', name, ['user_id'])
+
+
+def ledger_table(name, parent_key):
+    """Returns a lightweight table for inserting and reading ledger rows."""
+    return sa.table(name, sa.column('id'), sa.column('created_at', sa.DateTime),
+                    sa.column('updated_at', sa.DateTime), sa.column('name'),
+                    sa.column('amount', sa.Float), sa.column(parent_key),
+                    sa.column('user_id'))
+
+
+def upgrade():
+    bind = op.get_bind()
+    with op.batch_alter_table('users') as batch:
+        batch.add_column(sa.Column('data_version', sa.Integer(), nullable=False,
+                                   server_default='0'))
+
+    op.create_table(
+        'user_totals',
+        sa.Column('user_id', sa.String(60), sa.ForeignKey('users.id'), primary_key=True),
+        sa.Column('total_income', sa.Float(), nullable=False),
+        sa.Column('total_expenses', sa.Float(), nullable=False))
+    op.execute(
+        "INSERT INTO user_totals (user_id, total_income, total_expenses) "
+        "SELECT users.id, "
+        "COALESCE(SUM(CASE WHEN transactions.type = 'income' THEN transactions.amount END), 0), "
+        "COALESCE(SUM(CASE WHEN transactions.type = 'expense' THEN transactions.amount END), 0) "
+        "FROM users LEFT JOIN transactions ON transactions.user_id = users.id "
+        "GROUP BY users.id")
+
+    for name, parent, parent_key, legacy in LEDGERS:
+        create_ledger(name, parent, parent_key)
+        parents = sa.table(parent, sa.column('id'), sa.column('user_id'),
+                           sa.column('updated_at', sa.DateTime),
+                           sa.column(legacy, sa.JSON(none_as_null=True)))
+        rows = [{'id': str(uuid.uuid4()), 'name': str(entry.get('name', ''))[:128],
+                 'amount': float(entry.get('amount', 0)), parent_key: parent_id,
+                 'user_id': user_id, 'created_at': updated_at, 'updated_at': updated_at}
+                for parent_id, user_id, updated_at, entries in bind.execute(
+                    sa.select(parents).where(parents.c[legacy].isnot(None)))
+                for entry in entries or [] if isinstance(entry, dict)]
+        if rows:
+            op.bulk_insert(ledger_table(name, parent_key), rows)
+        with op.batch_alter_table(parent) as batch:
+            batch.drop_column(legacy)
+
+
+def downgrade():
+    bind = op.get_bind()
+    for name, parent, parent_key, legacy in LEDGERS:
+        with op.batch_alter_table(parent) as batch:
+            batch.add_column(sa.Column(legacy, sa.JSON()))
+        ledger = ledger_table(name, parent_key)
+        parents = sa.table(parent, sa.column('id'),
+                           sa.column(legacy, sa.JSON(none_as_null=True)))
+        entries = {}
+        for row in bind.execute(sa.select(ledger).order_by(ledger.c.created_at)):
+            entries.setdefault(row._mapping[parent_key], []).append(
+                {'name': row.name, 'amount': row.amount})
+        for parent_id, items in entries.items():
+            bind.execute(parents.update().where(parents.c.id == parent_id)
+                         .values({legacy: items}))
+        op.drop_table(name)
+
+    op.drop_table('user_totals')
+    with op.batch_alter_table('users') as batch:
+        batch.drop_column('data_version')
@@ -0,0 +1,49 @@
+"""Composite indexes for the hot query paths.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2024-08-01 00:00:02
+
+Adds transactions(user_id, date, id) for the keyset-paginated
+transaction list and the summary, and users(is_guest, last_activity)
+for the guest sweep and the guest pool. The composite index replaces
+the single-column transactions(user_id) one.
+
+Tables created by create_all before migrations carry a user_id index
+named ix_user_id; it is renamed to ix_<table>_user_id, or dropped on
+transactions, so that every index name is unique across the schema.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+
+def index_names(table):
+    """Returns the names of the indexes on table."""
+    return {index['name'] for index in sa.inspect(op.get_bind()).get_indexes(table)}
+
+
+def upgrade():
+    if 'ix_transactions_user_date_id' not in index_names('transactions'):
+        op.create_index('ix_transactions_user_date_id', 'transactions',
+                        ['user_id', 'date', 'id'])
+    if 'ix_users_guest_activity' not in index_names('users'):
+        op.create_index('ix_users_guest_activity', 'users', ['is_guest', 'last_activity'])
+    names = index_names('transactions')
+    for name in ('ix_transactions_user_id', 'ix_user_id'):
+        if name in names:
+            op.drop_index(name, table_name='transactions')
+    for table in ('budgets', 'savings'):
+        if 'ix_user_id' in index_names(table):
+            op.create_index(f'ix_{table}_user_id', table, ['user_id'])
+            op.drop_index('ix_user_id', table_name=table)
+
+
+def downgrade():
+    op.create_index('ix_transactions_user_id', 'transactions', ['user_id'])
+    op.drop_index('ix_users_guest_activity', table_name='users')
+    op.drop_index('ix_transactions_user_date_id', table_name='transactions')
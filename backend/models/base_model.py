@@ -1,11 +1,56 @@
 #!/usr/bin/python3
 """BaseModel module for the Sandoog project."""
 from sqlalchemy.orm import declarative_base
-from sqlalchemy import Column, String, DateTime
+from sqlalchemy import Column, String, DateTime, inspect
 from datetime import datetime, timezone
 import uuid
 
 Base = declarative_base()
+TIMESTAMPS = ('created_at', 'updated_at')
+_serializers = {}
+
+
+def _isoformat(value):
+    """Formats a timestamp column value."""
+    return value.isoformat() if value is not None else None
+
+
+def serializer(cls, fields=None):
+    """
+    Returns the function that turns a cls instance into a dictionary.
+
+    The function is generated once per class and field selection from
+    the mapped columns, so serializing a row is a single dict literal of
+    attribute reads. fields is a tuple of column names, or None for all.
+    """
+    key = (cls, fields)
+    function = _serializers.get(key)
+    if function is None:
+        names = [attr.key for attr in inspect(cls).column_attrs
+                 if fields is None or attr.key in fields]
+
+        def literal(read, stamp):
+            items = [f"'__class__': {cls.__name__!r}"]
+            for name in names:
+                value = read(name)
+                if name in TIMESTAMPS:
+                    value = stamp.format(value)
+                items.append(f'{name!r}: {value}')
+            return '{' + ', '.join(items) + '}'
+
+        # Loaded values are read straight from the instance dict; a row
+        # with an expired, deferred or unset column takes the attribute
+        # path, which loads it.
+        source = (f"def to_dict(obj):\n"
+                  f"    state = obj.__dict__\n"
+                  f"    try:\n"
+                  f"        return {literal(lambda name: f'state[{name!r}]', '{}.isoformat()')}\n"
+                  f"    except (KeyError, AttributeError):\n"
+                  f"        return {literal(lambda name: f'obj.{name}', '_isoformat({})')}\n")
+        namespace = {'_isoformat': _isoformat}
+        exec(source, namespace)
+        function = _serializers[key] = namespace['to_dict']
+    return function
 
 
 class BaseModel:
@@ -32,15 +77,13 @@ class BaseModel:
         storage.new(self)
         storage.save()
 
-    def to_dict(self):
-        """Converts the model instance to a dictionary format."""
-        my_dict = self.__dict__.copy()
-        my_dict['__class__'] = self.__class__.__name__
-        my_dict['created_at'] = self.created_at.isoformat()
-        my_dict['updated_at'] = self.updated_at.isoformat()
-        if '_sa_instance_state' in my_dict:
-            del my_dict['_sa_instance_state']
-        return my_dict
+    def to_dict(self, fields=None):
+        """
+        Converts the model instance to a dictionary format.
+
+        fields restricts the output to those columns; see serializer().
+        """
+        return serializer(type(self), fields)(self)
 
     def delete(self):
         """Deletes the current instance from the storage."""
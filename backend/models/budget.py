@@ -3,8 +3,6 @@
 from models.base_model import BaseModel, Base
 from sqlalchemy import Column, String, Float, ForeignKey, Index
 from sqlalchemy.orm import relationship
-from sqlalchemy.ext.mutable import MutableList
-from sqlalchemy import JSON
 
 
 class Budget(BaseModel, Base):
@@ -13,12 +11,11 @@ class Budget(BaseModel, Base):
     name = Column(String(128), nullable=False)
     amount = Column(Float, nullable=False)
     spent = Column(Float, default=0.0, nullable=False)
-    expenses = Column(MutableList.as_mutable(JSON), default=[])
     user_id = Column(String(60), ForeignKey('users.id'), nullable=False)
     user = relationship('User', back_populates='budgets')
 
     __table_args__ = (
-        Index('ix_user_id', 'user_id'),
+        Index('ix_budgets_user_id', 'user_id'),
     )
 
     def validate(self):
@@ -0,0 +1,28 @@
+#!/usr/bin/python3
+"""Defines the Contribution class."""
+from models.base_model import BaseModel, Base
+from sqlalchemy import Column, String, Float, ForeignKey, Index
+
+
+class Contribution(BaseModel, Base):
+    """Represents one contribution made towards a savings goal."""
+    __tablename__ = 'contributions'
+    name = Column(String(128), nullable=False)
+    amount = Column(Float, nullable=False)
+    savings_id = Column(String(60), ForeignKey('savings.id', ondelete='CASCADE'),
+                        nullable=False)
+    user_id = Column(String(60), ForeignKey('users.id'), nullable=False)
+
+    __table_args__ = (
+        Index('ix_contributions_savings_created_id', 'savings_id', 'created_at', 'id'),
+        Index('ix_contributions_user_id', 'user_id'),
+    )
+
+    def validate(self):
+        """Validates the contribution details."""
+        if self.amount < 0:
+            raise ValueError("Amount must be non-negative")
+
+    def __repr__(self):
+        """Returns a string representation of the contribution."""
+        return f'<Contribution {self.name}: ${self.amount}>'
@@ -4,40 +4,396 @@ import models
 from models.user import User
 from models.savings import Savings
 from models.budget import Budget
+from models.contribution import Contribution
+from models.expense import Expense
 from models.transaction import Transaction
-from models.base_model import Base
+from models.user_totals import UserTotals
+import os
 from os import getenv
+from datetime import date, datetime, timezone
+from contextlib import contextmanager
+import fcntl
+import hashlib
+import itertools
+import tempfile
+import threading
+import time
 import sqlalchemy
-from sqlalchemy import create_engine, event
-from sqlalchemy.orm import scoped_session, sessionmaker
+from sqlalchemy import (Date, and_, case, cast, create_engine, delete, event, func, insert, select,
+                        text, update)
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.orm import Session, attributes, load_only, scoped_session, sessionmaker
+from sqlalchemy.sql import Select
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool, StaticPool
+from sqlalchemy.util.concurrency import in_greenlet
+from greenlet import getcurrent
+from alembic import command
+from alembic.runtime.migration import MigrationContext
+from models.engine.migrations import SchemaOutdated, head_revision, migration_config
 
 classes = {
     "User": User,
     "Transaction": Transaction,
     "Budget": Budget,
-    "Savings": Savings
+    "Savings": Savings,
+    "Expense": Expense,
+    "Contribution": Contribution,
+    "UserTotals": UserTotals
 }
 
+OWNED_CLASSES = (Budget, Contribution, Expense, Savings, Transaction)
+
+SYNC_DRIVERS = {'aiosqlite': 'pysqlite', 'asyncmy': 'mysqldb', 'aiomysql': 'mysqldb',
+                'asyncpg': 'psycopg2'}
+
+
 def confirm_deleted_rows(conn, cursor, statement, parameters, context, executemany):
     context._confirm_deleted_rows = False
 
+
+def sum_transactions(session, user_ids=None):
+    """
+    Sums the income and expenses stored in the transactions table.
+
+    Returns a dict mapping user ids to [income, expenses].
+    """
+    query = select(Transaction.user_id, Transaction.type,
+                   func.coalesce(func.sum(Transaction.amount), 0.0)) \
+        .group_by(Transaction.user_id, Transaction.type)
+    if user_ids is not None:
+        query = query.where(Transaction.user_id.in_(user_ids))
+    sums = {}
+    for user_id, type, amount in session.execute(query):
+        sums.setdefault(user_id, [0.0, 0.0])[type == 'expense'] = amount
+    return sums
+
+
+def apply_transaction_deltas(session, flush_context, instances):
+    """
+    Keeps user_totals in step with the transactions being flushed.
+
+    Runs before every flush, so the totals are written in the same
+    database transaction as the inserts, updates and deletes of the
+    Transaction rows they summarize.
+    """
+    deltas = {}
+
+    def add(user_id, type, amount):
+        delta = deltas.setdefault(user_id, [0.0, 0.0])
+        delta[type == 'expense'] += float(amount)
+
+    for obj in session.new:
+        if isinstance(obj, Transaction):
+            add(obj.user_id, obj.type, obj.amount)
+    for obj in session.deleted:
+        if isinstance(obj, Transaction):
+            add(obj.user_id, obj.type, -obj.amount)
+    for obj in session.dirty:
+        if isinstance(obj, Transaction) and session.is_modified(obj):
+            old = {}
+            for key in ('user_id', 'type', 'amount'):
+                history = attributes.get_history(obj, key)
+                old[key] = history.deleted[0] if history.deleted else getattr(obj, key)
+            add(old['user_id'], old['type'], -old['amount'])
+            add(obj.user_id, obj.type, obj.amount)
+
+    pending = {o.user_id: o for o in session.new if isinstance(o, UserTotals)}
+    for obj in session.new:
+        if isinstance(obj, User) and obj.id not in pending:
+            pending[obj.id] = UserTotals(user_id=obj.id)
+            session.add(pending[obj.id])
+
+    removed = {o.id for o in session.deleted if isinstance(o, User)}
+    for user_id, (income, expenses) in deltas.items():
+        if user_id in removed or (income == 0 and expenses == 0):
+            continue
+        if user_id in pending:
+            pending[user_id].total_income += income
+            pending[user_id].total_expenses += expenses
+        else:
+            add_to_totals(session, user_id, income, expenses)
+
+
+def add_to_totals(session, user_id, income, expenses):
+    """
+    Adds amounts to the user_totals row of a user.
+
+    A missing row is created from the transactions already stored, so
+    this must run before the rows it accounts for are written.
+    """
+    totals = session.get(UserTotals, user_id)
+    if totals is None:
+        income_so_far, expenses_so_far = sum_transactions(
+            session, [user_id]).get(user_id, [0.0, 0.0])
+        session.add(UserTotals(user_id=user_id,
+                               total_income=income_so_far + income,
+                               total_expenses=expenses_so_far + expenses))
+    else:
+        totals.total_income = UserTotals.total_income + income
+        totals.total_expenses = UserTotals.total_expenses + expenses
+
+
+def bump_data_versions(session, flush_context, instances):
+    """
+    Increments users.data_version for every user whose budgets, savings
+    expenses or transactions are about to change, in the same database transaction.
+    """
+    user_ids = set()
+    for obj in list(session.new) + list(session.deleted):
+        if isinstance(obj, OWNED_CLASSES):
+            user_ids.add(obj.user_id)
+    for obj in session.dirty:
+        if isinstance(obj, OWNED_CLASSES) and session.is_modified(obj):
+            user_ids.add(obj.user_id)
+    user_ids -= {o.id for o in session.deleted if isinstance(o, User)}
+    for user_id in sorted(user_ids):
+        bump_data_version(session, user_id)
+
+
+def bump_data_version(session, user_id):
+    """Increments the data_version of a user."""
+    session.info.setdefault('written_users', set()).add(user_id)
+    session.execute(update(User).where(User.id == user_id)
+                    .values(data_version=User.data_version + 1)
+                    .execution_options(synchronize_session=False))
+
+
+def bucket_start(dialect, bucket, column):
+    """
+    Returns SQL truncating a datetime column to the first day of its
+    day, ISO week (Monday) or month bucket, as a date.
+    """
+    if dialect == 'sqlite':
+        modifiers = {'day': (), 'week': ('weekday 0', '-6 days'),
+                     'month': ('start of month',)}[bucket]
+        return func.date(column, *modifiers)
+    if dialect == 'postgresql':
+        return cast(func.date_trunc(bucket, column), Date)
+    day = func.date(column)
+    if bucket == 'week':
+        return func.subdate(day, func.weekday(column))
+    if bucket == 'month':
+        return func.subdate(day, func.dayofmonth(column) - 1)
+    return day
+
+
+def database_url():
+    """
+    Returns SAND00G_DB_URL, or a MySQL URL built from the
+    SAND00G_MYSQL_* variables when it is not set.
+    """
+    url = getenv('SAND00G_DB_URL')
+    if url:
+        return url
+    user = getenv('SAND00G_MYSQL_USER')
+    pwd = getenv('SAND00G_MYSQL_PWD')
+    host = getenv('SAND00G_MYSQL_HOST')
+    db = getenv('SAND00G_MYSQL_DB')
+    return 'mysql+mysqldb://{}:{}@{}/{}'.format(user, pwd, host, db)
+
+
+def sqlite_options(url):
+    """
+    Returns the engine settings for a SQLite URL.
+
+    Connections may be used from any thread; an in-memory database keeps
+    a single shared connection since each new one would be empty.
+    """
+    options = {'connect_args': {'check_same_thread': False}}
+    if url.database in (None, '', ':memory:'):
+        options['poolclass'] = StaticPool
+    else:
+        options.update(pool_options())
+    return options
+
+
+def set_sqlite_pragmas(dbapi_connection, connection_record):
+    """
+    Tunes each new SQLite connection: WAL journaling lets readers run
+    alongside the single writer, synchronous=NORMAL only syncs at WAL
+    checkpoints, busy_timeout waits for the write lock instead of
+    failing, and foreign_keys enables the ON DELETE CASCADE rules.
+    """
+    cursor = dbapi_connection.cursor()
+    cursor.execute('PRAGMA journal_mode=WAL')
+    cursor.execute('PRAGMA synchronous={}'.format(
+        getenv('SAND00G_SQLITE_SYNCHRONOUS', 'NORMAL')))
+    cursor.execute('PRAGMA busy_timeout={:d}'.format(
+        int(getenv('SAND00G_SQLITE_BUSY_TIMEOUT', '5000'))))
+    cursor.execute('PRAGMA foreign_keys=ON')
+    cursor.execute('PRAGMA temp_store=MEMORY')
+    cursor.close()
+
+
+def replica_urls():
+    """Returns the comma-separated read replica URLs of SAND00G_DB_REPLICA_URLS."""
+    return [url.strip() for url in getenv('SAND00G_DB_REPLICA_URLS', '').split(',')
+            if url.strip()]
+
+
+def sync_url(url):
+    """Returns url with an async driver swapped for the matching blocking one."""
+    url = make_url(url)
+    if not url.get_dialect().is_async:
+        return url
+    return url.set(drivername='{}+{}'.format(url.get_backend_name(),
+                                             SYNC_DRIVERS[url.get_driver_name()]))
+
+
+def make_engine(url):
+    """
+    Creates an engine for a database URL with the settings of its backend.
+
+    For an async driver this is the synchronous facade of an async
+    engine, which only works inside a greenlet run by greenlet_spawn.
+    """
+    url = make_url(url)
+    is_async = url.get_dialect().is_async
+    sqlite = url.get_backend_name() == 'sqlite'
+    options = sqlite_options(url) if sqlite else pool_options()
+    if is_async:
+        if options.get('poolclass') is QueuePool:
+            options['poolclass'] = AsyncAdaptedQueuePool
+        engine = create_async_engine(url, **options).sync_engine
+    else:
+        engine = create_engine(url, **options)
+    if sqlite:
+        event.listen(engine, 'connect', set_sqlite_pragmas)
+    event.listen(engine, 'before_cursor_execute', confirm_deleted_rows)
+    return engine
+
+
+class Replicas:
+    """
+    Hands out read replica engines round-robin.
+
+    A replica is checked with a test connection at most once every
+    retry_seconds, and one that fails the check, or loses a connection
+    in a query, is skipped for retry_seconds. Users who committed a write are pinned to the primary for
+    pin_seconds, so they do not read a replica that has not caught up.
+    Pins are kept per process.
+    """
+
+    def __init__(self, engines, pin_seconds=5.0, retry_seconds=30.0):
+        """Initializes the set over a list of engines."""
+        self.engines = engines
+        self.pin_seconds = pin_seconds
+        self.retry_seconds = retry_seconds
+        self.__turn = itertools.count()
+        self.__down = {}
+        self.__checked = {}
+        self.__pinned = {}
+        self.__lock = threading.Lock()
+        for engine in engines:
+            event.listen(engine, 'handle_error', self.__failed)
+
+    def pick(self):
+        """Returns the next reachable replica, or None when there is none."""
+        now = time.monotonic()
+        for _ in range(len(self.engines)):
+            engine = self.engines[next(self.__turn) % len(self.engines)]
+            if self.__down.get(engine, 0) > now:
+                continue
+            if self.__checked.get(engine, 0) <= now:
+                try:
+                    engine.connect().close()
+                except DBAPIError:
+                    self.mark_down(engine)
+                    continue
+                self.__checked[engine] = now + self.retry_seconds
+            return engine
+        return None
+
+    def mark_down(self, engine):
+        """Skips engine for the next retry_seconds."""
+        self.__down[engine] = time.monotonic() + self.retry_seconds
+        self.__checked.pop(engine, None)
+
+    def __failed(self, context):
+        """Marks a replica down when a statement could not get or lost its connection."""
+        if context.is_disconnect or context.connection is None:
+            self.mark_down(context.engine)
+
+    def pin(self, user_ids):
+        """Keeps user_ids on the primary for the next pin_seconds."""
+        if self.pin_seconds <= 0:
+            return
+        now = time.monotonic()
+        with self.__lock:
+            if len(self.__pinned) > 10000:
+                self.__pinned = {k: v for k, v in self.__pinned.items() if v > now}
+            for user_id in user_ids:
+                self.__pinned[user_id] = now + self.pin_seconds
+
+    def pinned(self, user_id):
+        """Tells whether user_id wrote in the last pin_seconds."""
+        return self.__pinned.get(user_id, 0) > time.monotonic()
+
+
+class RoutingSession(Session):
+    """
+    A session that sends SELECTs to a read replica once allowed to by
+    DBStorage.read_from_replica(), and everything else, including
+    SELECT ... FOR UPDATE, to the primary.
+
+    The first write switches the rest of the session to the primary, so
+    it reads what it wrote; a session with no reachable replica stays
+    on the primary.
+    """
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        """Picks the engine a statement runs on."""
+        if self.info.get('replica_reads'):
+            if (isinstance(clause, Select) and clause._for_update_arg is None
+                    and not self._flushing):
+                if 'replica' not in self.info:
+                    self.info['replica'] = self.info['replicas'].pick()
+                if self.info['replica'] is not None:
+                    return self.info['replica']
+            else:
+                self.info['replica_reads'] = False
+        return super().get_bind(mapper=mapper, clause=clause, **kwargs)
+
+
+def pin_writers(session):
+    """Pins the users whose data a session just committed to the primary."""
+    user_ids = session.info.pop('written_users', None)
+    if user_ids and session.info.get('replicas') is not None:
+        session.info['replicas'].pin(user_ids)
+
+
+def pool_options():
+    """Reads the connection pool settings from the environment."""
+    return {
+        'poolclass': QueuePool,
+        'pool_size': int(getenv('SAND00G_DB_POOL_SIZE', '5')),
+        'max_overflow': int(getenv('SAND00G_DB_MAX_OVERFLOW', '10')),
+        'pool_timeout': int(getenv('SAND00G_DB_POOL_TIMEOUT', '30')),
+        'pool_recycle': int(getenv('SAND00G_DB_POOL_RECYCLE', '3600')),
+        'pool_pre_ping': getenv('SAND00G_DB_POOL_PRE_PING', '1') == '1',
+    }
+
+
 class DBStorage:
-    """Interacts with the MySQL database."""
+    """Interacts with the database, MySQL unless SAND00G_DB_URL says otherwise.
+
+    The engine, its connection pool and the scoped session are shared by
+    every DBStorage instance in the process, so creating one is cheap.
+    """
     __engine = None
+    __replicas = None
     __session = None
     __session_factory = None
+    __lock = threading.Lock()
 
     def __init__(self):
         """Initializes the DBStorage instance."""
-        user = getenv('SAND00G_MYSQL_USER')
-        pwd = getenv('SAND00G_MYSQL_PWD')
-        host = getenv('SAND00G_MYSQL_HOST')
-        db = getenv('SAND00G_MYSQL_DB')
-        self.__engine = create_engine('mysql+mysqldb://{}:{}@{}/{}'.format(
-            user, pwd, host, db))
-        event.listen(self.__engine, 'before_cursor_execute', confirm_deleted_rows)
-        Base.metadata.create_all(self.__engine)
-        self.reload()
+        if DBStorage.__session is None:
+            with DBStorage.__lock:
+                if DBStorage.__session is None:
+                    self.reload()
 
     def all(self, cls=None):
         """
@@ -58,13 +414,314 @@ class DBStorage:
                     all_objects[key] = obj
         return all_objects
 
+    def by_user(self, cls, user_id, filters=None, order_by=None, limit=None,
+                fields=None):
+        """
+        Query the objects of a class owned by one user.
+
+        filters is a list of extra SQL criteria, order_by a column or a
+        list of columns, and limit the maximum number of rows returned.
+        fields, a list of column names, loads only those columns and the
+        primary key.
+        """
+        query = self.__session.query(cls).filter(cls.user_id == user_id)
+        if fields:
+            query = query.options(load_only(*[getattr(cls, name) for name in fields]))
+        if filters:
+            query = query.filter(*filters)
+        if order_by is not None:
+            if not isinstance(order_by, (list, tuple)):
+                order_by = [order_by]
+            query = query.order_by(*order_by)
+        if limit is not None:
+            query = query.limit(limit)
+        return query.all()
+
+    def stream_by_user(self, cls, user_id, order_by=None, batch_size=1000):
+        """
+        Yields the objects of a class owned by one user, loading them
+        from a server-side cursor batch_size rows at a time.
+        """
+        query = select(cls).where(cls.user_id == user_id) \
+            .execution_options(yield_per=batch_size)
+        if order_by is not None:
+            query = query.order_by(order_by)
+        yield from self.__session.scalars(query)
+
+    def add_transactions(self, user_id, rows):
+        """
+        Inserts a batch of transaction rows for one user and commits.
+
+        rows are dicts of column values; they are written with a single
+        executemany INSERT, and the user's totals and data_version are
+        updated in the same database transaction.
+        """
+        if not rows:
+            return
+        income = sum(r['amount'] for r in rows if r['type'] == 'income')
+        expenses = sum(r['amount'] for r in rows if r['type'] == 'expense')
+        add_to_totals(self.__session, user_id, income, expenses)
+        self.__session.flush()
+        self.__session.execute(insert(Transaction.__table__), rows)
+        bump_data_version(self.__session, user_id)
+        self.__session.commit()
+
+    def add_contribution(self, contribution):
+        """
+        Records a contribution and adds its amount to the savings entry.
+
+        saved is increased by a single 'saved = saved + amount' UPDATE
+        restricted to the contribution's owner, in the same commit as the
+        new row. Returns the new saved total, or None when the user has
+        no such savings entry.
+        """
+        result = self.__session.execute(
+            update(Savings)
+            .where(Savings.id == contribution.savings_id,
+                   Savings.user_id == contribution.user_id)
+            .values(saved=Savings.saved + contribution.amount,
+                    updated_at=datetime.now(timezone.utc))
+            .execution_options(synchronize_session=False))
+        if result.rowcount != 1:
+            return None
+        self.__session.add(contribution)
+        return self.__total(Savings.__table__.c.saved, contribution.savings_id)
+
+    def remove_contribution(self, contribution):
+        """
+        Deletes a contribution and subtracts its amount from the savings
+        entry in the same commit. Returns the new saved total, or None
+        when the contribution was already deleted.
+        """
+        return self.__remove_counted(contribution, Savings.__table__.c.saved,
+                                     contribution.savings_id)
+
+    def remove_expense(self, expense):
+        """
+        Deletes an expense and subtracts its amount from the budget in
+        the same commit. Returns the new spent total, or None when the
+        expense was already deleted.
+        """
+        return self.__remove_counted(expense, Budget.__table__.c.spent, expense.budget_id)
+
+    def __remove_counted(self, obj, total, parent_id):
+        """
+        Deletes obj and subtracts its amount from the total column of
+        its parent row.
+
+        The row is removed with a DELETE restricted to its owner and the
+        total only changes when that DELETE matched it, so deleting the
+        same row twice subtracts its amount once. The total never goes
+        below zero.
+        """
+        cls, user_id, amount = type(obj), obj.user_id, obj.amount
+        result = self.__session.execute(
+            delete(cls).where(cls.id == obj.id, cls.user_id == user_id)
+            .execution_options(synchronize_session=False))
+        if result.rowcount != 1:
+            return None
+        if obj in self.__session:
+            self.__session.expunge(obj)
+        parent = total.table
+        self.__session.execute(
+            update(parent)
+            .where(parent.c.id == parent_id, parent.c.user_id == user_id)
+            .values({total: case((total > amount, total - amount), else_=0.0),
+                     parent.c.updated_at: datetime.now(timezone.utc)}))
+        bump_data_version(self.__session, user_id)
+        return self.__total(total, parent_id)
+
+    def __total(self, total, parent_id):
+        """Reads the total column of a parent row and saves the session."""
+        value = self.__session.scalar(select(total).where(total.table.c.id == parent_id))
+        self.save()
+        return value
+
+    def purge_guests(self, cutoff, batch_size=500, on_batch=None):
+        """
+        Deletes guest users whose last activity is older than cutoff,
+        together with their rows in the other tables.
+
+        Works in set-based DELETEs of at most batch_size users, each batch
+        committed on its own and then passed to on_batch as a list of user
+        ids. Returns the number of rows removed per table.
+        """
+        removed = {}
+        children = (Transaction, Expense, Budget, Contribution, Savings, UserTotals)
+        stale = (User.is_guest.is_(True), User.last_activity < cutoff)
+        while True:
+            query = select(User.id).where(*stale).limit(batch_size)
+            if self.__engine.dialect.name != 'sqlite':
+                query = query.with_for_update(skip_locked=True)
+            user_ids = self.__session.scalars(query).all()
+            if not user_ids:
+                break
+            # Every DELETE checks the cutoff again, so a guest whose
+            # activity was written since the SELECT keeps all their rows.
+            still_stale = select(User.id).where(User.id.in_(user_ids), *stale)
+            for cls in children + (User,):
+                condition = and_(User.id.in_(user_ids), *stale) if cls is User \
+                    else cls.user_id.in_(still_stale)
+                result = self.__session.execute(
+                    delete(cls).where(condition)
+                    .execution_options(synchronize_session=False))
+                removed[cls.__tablename__] = removed.get(cls.__tablename__, 0) + result.rowcount
+            self.__session.commit()
+            if on_batch is not None:
+                on_batch(user_ids)
+        return removed
+
+    def guest_pool_depth(self):
+        """Returns the number of provisioned guests nobody has claimed."""
+        return self.__session.scalar(
+            select(func.count()).select_from(User)
+            .where(User.is_guest.is_(True), User.last_activity.is_(None)))
+
+    def add_guests(self, users, budgets, savings):
+        """
+        Inserts provisioned guests and their default rows and commits.
+
+        Each argument is a list of dicts of column values, written with
+        one executemany INSERT per table.
+        """
+        if not users:
+            return
+        self.__session.execute(insert(User.__table__), users)
+        self.__session.execute(insert(UserTotals.__table__),
+                               [{'user_id': u['id'], 'total_income': 0.0,
+                                 'total_expenses': 0.0} for u in users])
+        self.__session.execute(insert(Budget.__table__), budgets)
+        self.__session.execute(insert(Savings.__table__), savings)
+        self.__session.commit()
+
+    def claim_guest(self, now):
+        """
+        Claims one provisioned guest by setting its last_activity.
+
+        Concurrent callers each get a different guest without retrying.
+        SQLite picks and claims the guest in one UPDATE ... RETURNING,
+        which its write lock serializes; MySQL and PostgreSQL lock the
+        guest with SELECT ... FOR UPDATE SKIP LOCKED, so other callers
+        pass over it. Returns the User, or None when the pool is empty.
+        """
+        unclaimed = select(User.id) \
+            .where(User.is_guest.is_(True), User.last_activity.is_(None)) \
+            .limit(1)
+        if self.__engine.dialect.name == 'sqlite':
+            user_id = self.__session.scalar(
+                update(User)
+                .where(User.id == unclaimed.scalar_subquery())
+                .values(last_activity=now)
+                .returning(User.id)
+                .execution_options(synchronize_session=False))
+        else:
+            user_id = self.__session.scalar(unclaimed.with_for_update(skip_locked=True))
+            if user_id is not None:
+                self.__session.execute(
+                    update(User)
+                    .where(User.id == user_id)
+                    .values(last_activity=now)
+                    .execution_options(synchronize_session=False))
+        self.__session.commit()
+        if user_id is None:
+            return None
+        return self.__session.get(User, user_id, populate_existing=True)
+
+    def touch_users(self, seen, batch_size=500):
+        """
+        Sets the last_activity of the users in seen, a dict of user id to
+        timestamp, with one UPDATE per batch_size users.
+
+        Runs in a transaction of its own on the primary, outside the
+        current session, so it never commits a request's pending changes.
+        Provisioned guests nobody has claimed keep their NULL.
+        """
+        user_ids = list(seen)
+        with self.__engine.begin() as conn:
+            for start in range(0, len(user_ids), batch_size):
+                batch = user_ids[start:start + batch_size]
+                conn.execute(update(User)
+                             .where(User.id.in_(batch), User.last_activity.is_not(None))
+                             .values(last_activity=case({user_id: seen[user_id]
+                                                         for user_id in batch},
+                                                        value=User.id)))
+
+    @contextmanager
+    def lock(self, name):
+        """
+        Holds a process-wide lock named name without waiting for it.
+
+        Yields True when this process got the lock and False when another
+        one holds it. MySQL uses GET_LOCK and PostgreSQL an advisory lock,
+        so the lock spans every host sharing the database; SQLite falls
+        back to a file lock.
+        """
+        if self.__engine.dialect.name == 'postgresql':
+            key = int.from_bytes(hashlib.sha256(name.encode()).digest()[:8], 'big', signed=True)
+            with self.__engine.connect() as conn:
+                acquired = conn.execute(text('SELECT pg_try_advisory_lock(:key)'),
+                                        {'key': key}).scalar()
+                try:
+                    yield acquired
+                finally:
+                    if acquired:
+                        conn.execute(text('SELECT pg_advisory_unlock(:key)'), {'key': key})
+            return
+        if self.__engine.dialect.name == 'mysql':
+            with self.__engine.connect() as conn:
+                acquired = conn.execute(text('SELECT GET_LOCK(:name, 0)'),
+                                        {'name': name}).scalar() == 1
+                try:
+                    yield acquired
+                finally:
+                    if acquired:
+                        conn.execute(text('SELECT RELEASE_LOCK(:name)'), {'name': name})
+            return
+        with open(os.path.join(tempfile.gettempdir(), f'sandoog-{name}.lock'), 'w') as handle:
+            try:
+                fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                yield False
+                return
+            try:
+                yield True
+            finally:
+                fcntl.flock(handle, fcntl.LOCK_UN)
+
     def new(self, obj):
         """Add the object to the current database session."""
         self.__session.add(obj)
 
     def save(self):
-        """Commit all changes of the current database session."""
-        self.__session.commit()
+        """
+        Commit all changes of the current database session. Inside batch()
+        the changes are only flushed, to be committed when the batch ends.
+        """
+        if self.__session.info.get('batch'):
+            self.__session.flush()
+        else:
+            self.__session.commit()
+
+    @contextmanager
+    def batch(self):
+        """
+        Runs the block in one database transaction: save() only flushes,
+        and everything is committed when the block exits, or rolled back
+        if it raises.
+        """
+        self.__session.info['batch'] = True
+        try:
+            yield
+            self.__session.commit()
+        except BaseException:
+            self.__session.rollback()
+            raise
+        finally:
+            self.__session.info.pop('batch', None)
+
+    def savepoint(self):
+        """Starts a SAVEPOINT; commit() or rollback() the returned transaction."""
+        return self.__session.begin_nested()
 
     def delete(self, obj=None):
         """Delete obj from the current database session if not None."""
@@ -72,11 +729,155 @@ class DBStorage:
             self.__session.delete(obj)
 
     def reload(self):
-        """Reloads data from the database."""
-        Base.metadata.create_all(self.__engine)
-        self.__session_factory = sessionmaker(bind=self.__engine,
-                                              expire_on_commit=False)
-        self.__session = scoped_session(self.__session_factory)
+        """
+        Creates the shared engine, the read replica engines listed in
+        SAND00G_DB_REPLICA_URLS and the scoped session factory.
+
+        With an async driver in the database URL, sessions opened by
+        requests served from api.asgi use an async engine, one per
+        greenlet, while migrations, locks, scheduled jobs and CLI
+        commands keep a blocking engine on the matching sync driver.
+        """
+        url = make_url(database_url())
+        engine = make_engine(sync_url(url))
+        async_engine = make_engine(url) if url.get_dialect().is_async else None
+        replicas = [make_engine(url) for url in replica_urls()]
+        DBStorage.__engine = engine
+        DBStorage.__replicas = Replicas(
+            replicas,
+            pin_seconds=float(getenv('SAND00G_REPLICA_PIN_SECONDS', '5')),
+            retry_seconds=float(getenv('SAND00G_REPLICA_RETRY_SECONDS', '30'))) \
+            if replicas else None
+        factories = [sessionmaker(bind=bind, class_=RoutingSession, expire_on_commit=False,
+                                  info={'replicas': DBStorage.__replicas})
+                     for bind in filter(None, (engine, async_engine))]
+        for factory in factories:
+            event.listen(factory, 'before_flush', apply_transaction_deltas)
+            event.listen(factory, 'before_flush', bump_data_versions)
+            event.listen(factory, 'after_commit', pin_writers)
+        DBStorage.__session_factory = factories[0]
+        if async_engine is None:
+            DBStorage.__session = scoped_session(factories[0])
+        else:
+            DBStorage.__session = scoped_session(
+                lambda: factories[in_greenlet()](), scopefunc=getcurrent)
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=lambda: [
+                e.dispose(close=False) for e in filter(None, [engine, async_engine] + replicas)])
+
+    def has_replicas(self):
+        """Tells whether read replicas are configured."""
+        return self.__replicas is not None
+
+    def read_from_replica(self, user_id=None):
+        """
+        Lets the SELECTs of the current session go to a read replica until
+        it writes, unless user_id is pinned to the primary after a recent
+        write. Returns whether replica reads were enabled.
+        """
+        if self.__replicas is None or (user_id is not None and
+                                       self.__replicas.pinned(user_id)):
+            return False
+        self.__session.info['replica_reads'] = True
+        return True
+
+    def migrate(self, command_name, *args, **kwargs):
+        """
+        Runs an Alembic command such as upgrade, downgrade or stamp over
+        the storage engine, in one transaction where the backend allows.
+        """
+        with self.__engine.connect() as connection:
+            sqlite = connection.dialect.name == 'sqlite'
+            if sqlite:
+                # Batch operations rebuild SQLite tables by copying them;
+                # with foreign keys on, dropping the old copy would
+                # cascade into the child tables.
+                connection.exec_driver_sql('PRAGMA foreign_keys=OFF')
+                connection.commit()
+            try:
+                with connection.begin():
+                    return getattr(command, command_name)(
+                        migration_config(connection), *args, **kwargs)
+            finally:
+                if sqlite:
+                    connection.exec_driver_sql('PRAGMA foreign_keys=ON')
+                    connection.commit()
+
+    def schema_revision(self):
+        """Returns the migration revision the database is at, or None."""
+        with self.__engine.connect() as connection:
+            return MigrationContext.configure(connection).get_current_revision()
+
+    def check_schema(self):
+        """Raises SchemaOutdated unless the database is at the head revision."""
+        current, head = self.schema_revision(), head_revision()
+        if current != head:
+            raise SchemaOutdated(
+                f'Database schema is at revision {current}, the code expects '
+                f'{head}. Run: flask --app api.app db upgrade')
+
+    def data_version(self, user_id):
+        """Returns the change counter of a user's data, or None."""
+        return self.__session.query(User.data_version) \
+            .filter(User.id == user_id).scalar()
+
+    def series(self, user_id, bucket, start, end):
+        """
+        Sums a user's transactions per bucket and type with a GROUP BY,
+        for dates from start (inclusive) to end (exclusive).
+
+        Returns {(bucket_start, type): total} with bucket_start a date;
+        see bucket_start() for the buckets.
+        """
+        key = bucket_start(self.__engine.dialect.name, bucket, Transaction.date)
+        rows = self.__session.execute(
+            select(key, Transaction.type, func.sum(Transaction.amount))
+            .where(Transaction.user_id == user_id,
+                   Transaction.date >= start, Transaction.date < end)
+            .group_by(key, Transaction.type))
+        return {(value if isinstance(value, date) else date.fromisoformat(value), type): total
+                for value, type, total in rows}
+
+    def totals(self, user_id):
+        """
+        Returns the (income, expenses) totals of a user.
+
+        Reads the user_totals rollup and only sums the raw transactions
+        when the user has no rollup row yet.
+        """
+        totals = self.__session.get(UserTotals, user_id)
+        if totals is not None:
+            return totals.total_income, totals.total_expenses
+        income, expenses = sum_transactions(
+            self.__session, [user_id]).get(user_id, [0.0, 0.0])
+        return income, expenses
+
+    def rebuild_totals(self, tolerance=0.005):
+        """
+        Rebuilds user_totals from the transactions table.
+
+        Returns a list of (user_id, stored, actual) tuples for every user
+        whose rollup had drifted, where stored and actual are
+        (income, expenses) pairs; stored is None for a missing row.
+        """
+        sums = sum_transactions(self.__session)
+        stored = {t.user_id: t for t in self.__session.query(UserTotals)}
+        drift = []
+        for (user_id,) in self.__session.query(User.id):
+            income, expenses = sums.get(user_id, [0.0, 0.0])
+            totals = stored.get(user_id)
+            if totals is None:
+                drift.append((user_id, None, (income, expenses)))
+                self.__session.add(UserTotals(user_id=user_id, total_income=income,
+                                              total_expenses=expenses))
+            elif (abs(totals.total_income - income) > tolerance or
+                  abs(totals.total_expenses - expenses) > tolerance):
+                drift.append((user_id, (totals.total_income, totals.total_expenses),
+                              (income, expenses)))
+                totals.total_income = income
+                totals.total_expenses = expenses
+        self.__session.commit()
+        return drift
 
     def close(self):
         """Call remove() method on the scoped session factory."""
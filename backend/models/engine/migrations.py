@@ -0,0 +1,25 @@
+#!/usr/bin/python3
+"""Versioned schema migrations, run with Alembic."""
+from alembic.config import Config
+from alembic.script import ScriptDirectory
+import os
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                              os.pardir, os.pardir, 'migrations')
+
+
+class SchemaOutdated(RuntimeError):
+    """Raised when the database schema is behind the migrations."""
+
+
+def migration_config(connection=None):
+    """Returns an Alembic config running the scripts over connection."""
+    config = Config()
+    config.set_main_option('script_location', os.path.normpath(MIGRATIONS_DIR))
+    config.attributes['connection'] = connection
+    return config
+
+
+def head_revision():
+    """Returns the revision the code expects the schema to be at."""
+    return ScriptDirectory.from_config(migration_config()).get_current_head()
@@ -0,0 +1,28 @@
+#!/usr/bin/python3
+"""Defines the Expense class."""
+from models.base_model import BaseModel, Base
+from sqlalchemy import Column, String, Float, ForeignKey, Index
+
+
+class Expense(BaseModel, Base):
+    """Represents one expense recorded against a budget."""
+    __tablename__ = 'expenses'
+    name = Column(String(128), nullable=False)
+    amount = Column(Float, nullable=False)
+    budget_id = Column(String(60), ForeignKey('budgets.id', ondelete='CASCADE'),
+                       nullable=False)
+    user_id = Column(String(60), ForeignKey('users.id'), nullable=False)
+
+    __table_args__ = (
+        Index('ix_expenses_budget_created_id', 'budget_id', 'created_at', 'id'),
+        Index('ix_expenses_user_id', 'user_id'),
+    )
+
+    def validate(self):
+        """Validates the expense details."""
+        if self.amount < 0:
+            raise ValueError("Amount must be non-negative")
+
+    def __repr__(self):
+        """Returns a string representation of the expense."""
+        return f'<Expense {self.name}: ${self.amount}>'
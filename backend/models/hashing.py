@@ -0,0 +1,159 @@
+#!/usr/bin/python3
+"""Password hashing off the request threads, in a process pool."""
+from werkzeug.security import generate_password_hash, check_password_hash
+from concurrent.futures import ProcessPoolExecutor, TimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from os import getenv
+from sqlalchemy.util.concurrency import await_only, in_greenlet
+import asyncio
+import multiprocessing
+import os
+import threading
+import time
+
+HASH_METHOD = getenv('SAND00G_HASH_METHOD', 'scrypt')
+HASH_WORKERS = int(getenv('SAND00G_HASH_WORKERS', '2'))
+HASH_QUEUE = int(getenv('SAND00G_HASH_QUEUE', '64'))
+HASH_TIMEOUT = float(getenv('SAND00G_HASH_TIMEOUT', '5'))
+
+stats = {
+    'hashes': 0,
+    'rejected': 0,
+    'timeouts': 0,
+    'queue_wait_seconds': 0.0,
+    'queue_wait_seconds_max': 0.0,
+    'hash_seconds': 0.0,
+    'hash_seconds_max': 0.0,
+}
+
+_pool = None
+_slots = threading.BoundedSemaphore(HASH_QUEUE)
+_lock = threading.Lock()
+_method_prefix = None
+
+
+class HashingBusy(RuntimeError):
+    """Raised when a password cannot be hashed in time."""
+
+
+def _timed(func, *args):
+    """Runs func in a worker and returns its result with start and end times."""
+    started = time.time()
+    result = func(*args)
+    return result, started, time.time()
+
+
+def _get_pool():
+    """
+    Returns the process pool, creating it in the current process.
+
+    Workers are forked so they do not re-import the app's main module.
+    """
+    global _pool
+    with _lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(
+                max_workers=HASH_WORKERS,
+                mp_context=multiprocessing.get_context('fork'))
+        return _pool
+
+
+def start_pool():
+    """
+    Forks the pool's workers now. The app calls this before it starts
+    any threads, since a fork of a process running other threads can
+    leave the workers stuck on locks those threads held.
+    """
+    if HASH_WORKERS > 0:
+        _get_pool().submit(int).result()
+
+
+def _forget_pool():
+    """Drops a pool inherited from the parent process."""
+    global _pool
+    _pool = None
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_forget_pool)
+
+
+def _wait(future):
+    """
+    Waits up to HASH_TIMEOUT for a pool result. Requests served by
+    api.asgi yield to the event loop meanwhile instead of blocking it.
+    """
+    if in_greenlet():
+        return await_only(asyncio.wait_for(asyncio.wrap_future(future), HASH_TIMEOUT))
+    return future.result(timeout=HASH_TIMEOUT)
+
+
+def _record(submitted, started, finished):
+    """Adds one hash to the stats."""
+    wait = max(started - submitted, 0.0)
+    duration = finished - started
+    with _lock:
+        stats['hashes'] += 1
+        stats['queue_wait_seconds'] += wait
+        stats['queue_wait_seconds_max'] = max(stats['queue_wait_seconds_max'], wait)
+        stats['hash_seconds'] += duration
+        stats['hash_seconds_max'] = max(stats['hash_seconds_max'], duration)
+
+
+def _run(func, *args):
+    """
+    Runs a hashing function in the process pool and waits for it.
+
+    Raises HashingBusy when HASH_QUEUE calls are already waiting or the
+    result takes longer than HASH_TIMEOUT seconds.
+    """
+    submitted = time.time()
+    if HASH_WORKERS <= 0:
+        result, started, finished = _timed(func, *args)
+        _record(submitted, started, finished)
+        return result
+    if not _slots.acquire(blocking=False):
+        with _lock:
+            stats['rejected'] += 1
+        raise HashingBusy('Too many passwords waiting to be hashed')
+    global _pool
+    try:
+        future = _get_pool().submit(_timed, func, *args)
+    except BrokenProcessPool:
+        _slots.release()
+        with _lock:
+            _pool = None
+        raise HashingBusy('Password hashing pool is restarting')
+    # The slot is held until the worker is done, not just until we stop
+    # waiting, so HASH_QUEUE bounds the hashes actually queued.
+    future.add_done_callback(lambda future: _slots.release())
+    try:
+        result, started, finished = _wait(future)
+    except (TimeoutError, asyncio.TimeoutError):
+        with _lock:
+            stats['timeouts'] += 1
+        raise HashingBusy('Password hashing timed out')
+    except BrokenProcessPool:
+        with _lock:
+            _pool = None
+        raise HashingBusy('Password hashing pool is restarting')
+    _record(submitted, started, finished)
+    return result
+
+
+def hash_password(password):
+    """Hashes a password with HASH_METHOD."""
+    return _run(generate_password_hash, password, HASH_METHOD)
+
+
+def verify_password(pwhash, password):
+    """Checks a password against a stored hash."""
+    return _run(check_password_hash, pwhash, password)
+
+
+def needs_rehash(pwhash):
+    """Tells whether a stored hash uses other parameters than HASH_METHOD."""
+    global _method_prefix
+    if _method_prefix is None:
+        _method_prefix = generate_password_hash('', HASH_METHOD).split('$', 1)[0]
+    return pwhash.split('$', 1)[0] != _method_prefix
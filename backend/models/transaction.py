@@ -20,13 +20,20 @@ class Transaction(BaseModel, Base):
                   nullable=False)
 
     __table_args__ = (
-        Index('ix_user_id', 'user_id'),
+        Index('ix_transactions_user_date_id', 'user_id', 'date', 'id'),
     )
 
     def validate(self):
         """Validates the transaction details."""
-        if self.amount < 0:
+        self.validate_fields(self.amount, self.type)
+
+    @staticmethod
+    def validate_fields(amount, type):
+        """Validates transaction fields before an object is built."""
+        if amount < 0:
             raise ValueError("Amount must be non-negative")
+        if type not in ('income', 'expense'):
+            raise ValueError("Type must be income or expense")
 
     def __repr__(self):
         """Returns a string representation of the transaction."""
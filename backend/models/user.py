@@ -2,9 +2,9 @@
 """Defines the User class."""
 import datetime
 from models.base_model import BaseModel, Base
-from sqlalchemy import Boolean, Column, DateTime, String
+from sqlalchemy import Boolean, Column, DateTime, Index, Integer, String
 from sqlalchemy.orm import relationship
-from werkzeug.security import generate_password_hash, check_password_hash
+from models.hashing import hash_password, verify_password, needs_rehash
 
 
 class User(BaseModel, Base):
@@ -14,12 +14,18 @@ class User(BaseModel, Base):
     password = Column(String(255), nullable=False)
     role = Column(String(50), nullable=False, default='user')
     is_guest = Column(Boolean, default=False)
-    last_activity = Column(DateTime, default=datetime.datetime.now(datetime.timezone.utc), onupdate=datetime.datetime.now(datetime.timezone.utc))
+    last_activity = Column(DateTime, default=lambda: datetime.datetime.now(datetime.timezone.utc))
+    data_version = Column(Integer, default=0, nullable=False)
+
+    __table_args__ = (
+        Index('ix_users_guest_activity', 'is_guest', 'last_activity'),
+    )
 
 
     from models.savings import Savings
     from models.budget import Budget
     from models.transaction import Transaction
+    from models.user_totals import UserTotals
 
     transactions = relationship('Transaction', back_populates='user',
                                 cascade='all, delete, delete-orphan')
@@ -27,6 +33,8 @@ class User(BaseModel, Base):
                            cascade='all, delete, delete-orphan')
     savings = relationship('Savings', back_populates='user',
                            cascade='all, delete, delete-orphan')
+    totals = relationship('UserTotals', uselist=False,
+                          cascade='all, delete, delete-orphan')
 
     def __init__(self, *args, **kwargs):
         """Initializes a new User instance."""
@@ -38,11 +46,20 @@ class User(BaseModel, Base):
 
     def set_password(self, password):
         """Sets the user's password after hashing it."""
-        self.password = generate_password_hash(password)
+        self.password = hash_password(password)
 
     def check_password(self, password):
-        """Checks the user's password."""
-        return check_password_hash(self.password, password)
+        """
+        Checks the user's password.
+
+        A correct password stored with outdated hash parameters is
+        rehashed; the caller saves the user to persist the new hash.
+        """
+        if not verify_password(self.password, password):
+            return False
+        if needs_rehash(self.password):
+            self.password = hash_password(password)
+        return True
 
     def __repr__(self):
         """Returns a string representation of the user."""
@@ -0,0 +1,28 @@
+#!/usr/bin/python3
+"""Defines the UserTotals class."""
+from models.base_model import Base
+from sqlalchemy import Column, Float, String, ForeignKey
+
+
+class UserTotals(Base):
+    """Running income and expense totals of a user's transactions."""
+    __tablename__ = 'user_totals'
+    user_id = Column(String(60), ForeignKey('users.id'), primary_key=True)
+    total_income = Column(Float, default=0.0, nullable=False)
+    total_expenses = Column(Float, default=0.0, nullable=False)
+
+    def __init__(self, *args, **kwargs):
+        """Initializes a new UserTotals instance with zero totals."""
+        self.total_income = 0.0
+        self.total_expenses = 0.0
+        for key, value in kwargs.items():
+            setattr(self, key, value)
+
+    @property
+    def total_balance(self):
+        """Returns the income minus the expenses."""
+        return self.total_income - self.total_expenses
+
+    def __repr__(self):
+        """Returns a string representation of the totals."""
+        return f'<UserTotals {self.user_id}: +${self.total_income}, -${self.total_expenses}>'
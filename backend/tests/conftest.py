@@ -0,0 +1,49 @@
+"""
+Runs the tests against a migrated SQLite database in a temporary file,
+with a second file configured as its read replica.
+"""
+import os
+import sys
+import tempfile
+
+DB_DIR = tempfile.mkdtemp(prefix='sandoog-tests-')
+PRIMARY = os.path.join(DB_DIR, 'test.db')
+REPLICA = os.path.join(DB_DIR, 'replica', 'test.db')
+os.makedirs(os.path.dirname(REPLICA))
+os.environ['SAND00G_DB_URL'] = f'sqlite:///{PRIMARY}'
+os.environ['SAND00G_DB_REPLICA_URLS'] = f'sqlite:///{REPLICA}'
+os.environ['SAND00G_REPLICA_PIN_SECONDS'] = '1'
+os.environ['SAND00G_REPLICA_RETRY_SECONDS'] = '0.2'
+os.environ.setdefault('JWT_SECRET_KEY', 'test-secret')
+os.environ['SAND00G_GUEST_POOL_SIZE'] = '0'
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+import uuid
+from models.engine.db_storage import DBStorage
+from models.user import User
+
+
+@pytest.fixture(scope='session')
+def storage():
+    """Returns the storage, with the schema migrated to head."""
+    storage = DBStorage()
+    storage.migrate('upgrade', 'head')
+    return storage
+
+
+@pytest.fixture(autouse=True)
+def fresh_session(storage):
+    """Starts every test with an empty session."""
+    storage.close()
+    yield
+    storage.close()
+
+
+@pytest.fixture
+def user_id(storage):
+    """Returns the id of a new user with no data."""
+    user = User(username=f'user-{uuid.uuid4().hex[:12]}', password='x')
+    storage.new(user)
+    storage.save()
+    return user.id
@@ -0,0 +1,64 @@
+"""Tests for the last activity write-behind buffer."""
+from datetime import datetime, timedelta, timezone
+import threading
+import time
+from sqlalchemy.exc import OperationalError
+from api.activity import ActivityBuffer
+from models.engine.db_storage import DBStorage
+from models.user import User
+
+START = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+def test_flush_writes_last_activity(storage, user_id):
+    buffer = ActivityBuffer(max_users=100)
+    buffer.touch(user_id, START)
+    assert buffer.flush() == 1
+    assert len(buffer) == 0
+    storage.close()
+    assert storage.get(User, id=user_id).last_activity.replace(tzinfo=None) == \
+        START.replace(tzinfo=None)
+
+
+def test_touch_drops_users_seen_longest_ago(monkeypatch):
+    written, started, release = [], threading.Event(), threading.Event()
+
+    def touch_users(self, seen):
+        started.set()
+        release.wait(5)
+        written.append(sorted(seen))
+
+    monkeypatch.setattr(DBStorage, 'touch_users', touch_users)
+    buffer = ActivityBuffer(max_users=3)
+    for n in range(3):
+        buffer.touch(f'first-{n}')
+    assert started.wait(5)
+    for n in range(5):
+        buffer.touch(f'user-{n}')
+    buffer.touch('user-2')
+    assert len(buffer) == 3
+    release.set()
+    buffer.flush()
+    assert written[-1] == ['user-2', 'user-3', 'user-4']
+
+
+def test_failed_flush_backs_off(monkeypatch):
+    calls = []
+
+    def touch_users(self, seen):
+        calls.append(len(seen))
+        raise OperationalError('UPDATE', {}, Exception('database is down'))
+
+    monkeypatch.setattr(DBStorage, 'touch_users', touch_users)
+    buffer = ActivityBuffer(max_users=10, retry_seconds=60)
+    threads = threading.active_count()
+    for n in range(200):
+        buffer.touch(f'user-{n}')
+    deadline = time.monotonic() + 5
+    while threading.active_count() > threads and time.monotonic() < deadline:
+        time.sleep(0.01)
+    for n in range(200):
+        buffer.touch(f'late-{n}')
+
+    assert len(calls) == 1
+    assert len(buffer) == 10
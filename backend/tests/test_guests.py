@@ -0,0 +1,62 @@
+"""Tests for the sweep of inactive guests."""
+from datetime import datetime, timedelta, timezone
+import uuid
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from models.budget import Budget
+from models.transaction import Transaction
+from models.user import User
+
+NOW = datetime(2026, 1, 1, 12, 0, tzinfo=timezone.utc)
+CUTOFF = NOW - timedelta(minutes=15)
+
+
+def guest(storage, last_activity, is_guest=True):
+    """Stores a user with a budget and a transaction and returns its id."""
+    user = User(username=f'guest_{uuid.uuid4()}', password='x', is_guest=is_guest,
+                last_activity=last_activity)
+    storage.new(user)
+    storage.new(Budget(name='Food', amount=10.0, spent=0.0, user_id=user.id))
+    storage.new(Transaction(amount=5.0, type='income', description='Pay', user_id=user.id))
+    storage.save()
+    return user.id
+
+
+def remaining(storage, user_id):
+    """Returns how many of the user's rows are left, read from a new session."""
+    storage.close()
+    return (storage.get(User, id=user_id) is not None,
+            len(storage.by_user(Budget, user_id)),
+            len(storage.by_user(Transaction, user_id)))
+
+
+def test_purge_removes_inactive_guests_only(storage):
+    stale = guest(storage, NOW - timedelta(hours=1))
+    active = guest(storage, NOW)
+    member = guest(storage, NOW - timedelta(hours=1), is_guest=False)
+    purged = []
+    storage.purge_guests(CUTOFF, on_batch=purged.extend)
+
+    assert stale in purged
+    assert remaining(storage, stale) == (False, 0, 0)
+    assert remaining(storage, active) == (True, 1, 1)
+    assert remaining(storage, member) == (True, 1, 1)
+
+
+def test_purge_keeps_guest_active_since_the_select(storage):
+    user_id = guest(storage, NOW - timedelta(hours=1))
+    def touch_before_first_delete(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith('DELETE') and not touched:
+            touched.append(statement)
+            cursor.execute('UPDATE users SET last_activity = ? WHERE id = ?',
+                           (NOW.replace(tzinfo=None).isoformat(' '), user_id))
+
+    touched = []
+    event.listen(Engine, 'before_cursor_execute', touch_before_first_delete)
+    try:
+        storage.purge_guests(CUTOFF)
+    finally:
+        event.remove(Engine, 'before_cursor_execute', touch_before_first_delete)
+
+    assert touched
+    assert remaining(storage, user_id) == (True, 1, 1)
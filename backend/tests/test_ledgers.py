@@ -0,0 +1,108 @@
+"""Tests for the contribution and expense ledgers."""
+import pytest
+from models.budget import Budget
+from models.contribution import Contribution
+from models.expense import Expense
+from models.savings import Savings
+
+
+@pytest.fixture
+def savings_id(storage, user_id):
+    """Returns the id of a new savings entry of the user."""
+    savings = Savings(name='Holiday', goal=100.0, saved=0.0, user_id=user_id)
+    storage.new(savings)
+    storage.save()
+    return savings.id
+
+
+@pytest.fixture
+def budget_id(storage, user_id):
+    """Returns the id of a new budget of the user with 30.0 spent."""
+    budget = Budget(name='Food', amount=100.0, spent=30.0, user_id=user_id)
+    storage.new(budget)
+    storage.save()
+    return budget.id
+
+
+def contribute(storage, user_id, savings_id, amount):
+    """Records a contribution and returns it."""
+    contribution = Contribution(name='Deposit', amount=amount,
+                                savings_id=savings_id, user_id=user_id)
+    storage.add_contribution(contribution)
+    return contribution
+
+
+def saved(storage, savings_id):
+    """Returns the stored saved total, read from a new session."""
+    storage.close()
+    return storage.get(Savings, id=savings_id).saved
+
+
+def test_contributions_change_saved(storage, user_id, savings_id):
+    contribute(storage, user_id, savings_id, 10.0)
+    contribution = contribute(storage, user_id, savings_id, 5.0)
+    assert saved(storage, savings_id) == 15.0
+    assert storage.remove_contribution(contribution) == 10.0
+    assert saved(storage, savings_id) == 10.0
+
+
+def test_removing_contribution_twice_subtracts_once(storage, user_id, savings_id):
+    contribute(storage, user_id, savings_id, 10.0)
+    contribution = contribute(storage, user_id, savings_id, 10.0)
+    storage.close()
+    first = storage.get(Contribution, id=contribution.id)
+    second = Contribution(id=contribution.id, name=first.name, amount=first.amount,
+                          savings_id=savings_id, user_id=user_id)
+
+    assert storage.remove_contribution(first) == 10.0
+    assert storage.remove_contribution(second) is None
+    assert saved(storage, savings_id) == 10.0
+
+
+def test_removing_contribution_keeps_saved_non_negative(storage, user_id, savings_id):
+    contribution = contribute(storage, user_id, savings_id, 10.0)
+    storage.get(Savings, id=savings_id).saved = 4.0
+    storage.save()
+    assert storage.remove_contribution(contribution) == 0.0
+    assert saved(storage, savings_id) == 0.0
+
+
+def test_removing_contribution_bumps_data_version(storage, user_id, savings_id):
+    contribution = contribute(storage, user_id, savings_id, 10.0)
+    version = storage.data_version(user_id)
+    storage.remove_contribution(contribution)
+    storage.close()
+    assert storage.data_version(user_id) == version + 1
+
+
+def expense(storage, user_id, budget_id, amount):
+    """Stores an expense without touching the budget and returns it."""
+    expense = Expense(name='Groceries', amount=amount, budget_id=budget_id,
+                      user_id=user_id)
+    storage.new(expense)
+    storage.save()
+    return expense
+
+
+def spent(storage, budget_id):
+    """Returns the stored spent total, read from a new session."""
+    storage.close()
+    return storage.get(Budget, id=budget_id).spent
+
+
+def test_removing_expense_twice_subtracts_once(storage, user_id, budget_id):
+    stored = expense(storage, user_id, budget_id, 20.0)
+    storage.close()
+    first = storage.get(Expense, id=stored.id)
+    second = Expense(id=stored.id, name=first.name, amount=first.amount,
+                     budget_id=budget_id, user_id=user_id)
+
+    assert storage.remove_expense(first) == 10.0
+    assert storage.remove_expense(second) is None
+    assert spent(storage, budget_id) == 10.0
+
+
+def test_removing_expense_keeps_spent_non_negative(storage, user_id, budget_id):
+    stored = expense(storage, user_id, budget_id, 50.0)
+    assert storage.remove_expense(stored) == 0.0
+    assert spent(storage, budget_id) == 0.0
@@ -0,0 +1,87 @@
+"""Tests for routing reads to a read replica."""
+import os
+import sqlite3
+import time
+import uuid
+import pytest
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from conftest import PRIMARY, REPLICA
+
+
+def replicate():
+    """Copies the primary database into the replica file."""
+    with sqlite3.connect(PRIMARY) as source, sqlite3.connect(REPLICA) as target:
+        source.backup(target)
+    source.close()
+    target.close()
+
+
+@pytest.fixture
+def client(storage):
+    """Returns a test client of the app."""
+    from api.app import app
+    return app.test_client()
+
+
+@pytest.fixture
+def headers(client):
+    """Registers a user and returns the headers authenticating as them."""
+    response = client.post('/api/register', json={'username': f'user-{uuid.uuid4().hex[:12]}',
+                                                  'password': 'password123'})
+    return {'Authorization': f"Bearer {response.get_json()['access_token']}"}
+
+
+@pytest.fixture
+def served_by():
+    """Returns a function mapping a request to the databases that ran its ledger reads."""
+    engines = {}
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if 'FROM transactions' in statement:
+            engines[conn.engine.url.database] = conn.engine
+
+    def served_by(request):
+        engines.clear()
+        assert request().status_code == 200
+        return set(engines)
+
+    served_by.engines = engines
+    event.listen(Engine, 'before_cursor_execute', record)
+    yield served_by
+    event.remove(Engine, 'before_cursor_execute', record)
+
+
+def test_get_reads_from_replica(client, headers, served_by):
+    replicate()
+    time.sleep(1.1)
+    assert served_by(lambda: client.get('/api/transactions', headers=headers)) == {REPLICA}
+
+
+def test_writer_reads_from_primary_within_pin(client, headers, served_by):
+    replicate()
+    time.sleep(1.1)
+    assert served_by(lambda: client.get('/api/transactions', headers=headers)) == {REPLICA}
+
+    response = client.post('/api/transactions', headers=headers,
+                           json={'amount': 5, 'type': 'income', 'description': 'Pay',
+                                 'date': '2026-01-01'})
+    assert response.status_code == 201
+    assert served_by(lambda: client.get('/api/transactions', headers=headers)) == {PRIMARY}
+    time.sleep(1.1)
+    assert served_by(lambda: client.get('/api/transactions', headers=headers)) == {REPLICA}
+
+
+def test_falls_back_to_primary_when_replica_is_down(client, headers, served_by):
+    replicate()
+    time.sleep(1.1)
+    assert served_by(lambda: client.get('/api/transactions', headers=headers)) == {REPLICA}
+
+    replica = os.path.dirname(REPLICA)
+    served_by.engines[REPLICA].dispose()
+    os.rename(replica, f'{replica}-down')
+    try:
+        time.sleep(0.3)
+        assert served_by(lambda: client.get('/api/transactions', headers=headers)) == {PRIMARY}
+    finally:
+        os.rename(f'{replica}-down', replica)
@@ -0,0 +1,131 @@
+"""Tests for the user_totals rollup and the repair-totals command."""
+import uuid
+import pytest
+from models.transaction import Transaction
+from models.user import User
+from models.user_totals import UserTotals
+
+
+def add(storage, user_id, amount, type):
+    """Adds a transaction for the user and commits it."""
+    transaction = Transaction(user_id=user_id, amount=amount, type=type,
+                              description=f'{type} {amount}')
+    storage.new(transaction)
+    storage.save()
+    return transaction
+
+
+def totals(storage, user_id):
+    """Returns the stored totals of the user, read from a new session."""
+    storage.close()
+    return storage.totals(user_id)
+
+
+def test_new_user_gets_zero_totals(storage, user_id):
+    assert totals(storage, user_id) == (0.0, 0.0)
+    assert storage.get(UserTotals, user_id=user_id) is not None
+
+
+def test_insert_adds_to_totals(storage, user_id):
+    add(storage, user_id, 100.0, 'income')
+    add(storage, user_id, 30.0, 'expense')
+    add(storage, user_id, 12.5, 'expense')
+    assert totals(storage, user_id) == (100.0, 42.5)
+
+
+def test_bulk_insert_adds_to_totals(storage, user_id):
+    add(storage, user_id, 10.0, 'income')
+    storage.add_transactions(user_id, [
+        {'id': str(uuid.uuid4()), 'user_id': user_id, 'amount': amount,
+         'type': type, 'description': 'imported'}
+        for amount, type in ((5.0, 'income'), (7.0, 'expense'), (1.0, 'expense'))])
+    assert totals(storage, user_id) == (15.0, 8.0)
+
+
+def test_update_moves_amount(storage, user_id):
+    transaction = add(storage, user_id, 50.0, 'income')
+    add(storage, user_id, 20.0, 'expense')
+    transaction.amount = 80.0
+    storage.save()
+    assert totals(storage, user_id) == (80.0, 20.0)
+
+    transaction = storage.get(Transaction, id=transaction.id)
+    transaction.type = 'expense'
+    storage.save()
+    assert totals(storage, user_id) == (0.0, 100.0)
+
+
+def test_update_without_changes_keeps_totals(storage, user_id):
+    transaction = add(storage, user_id, 50.0, 'income')
+    transaction.amount = 50.0
+    transaction.description = 'renamed'
+    storage.save()
+    assert totals(storage, user_id) == (50.0, 0.0)
+
+
+def test_delete_subtracts_from_totals(storage, user_id):
+    add(storage, user_id, 60.0, 'income')
+    transaction = add(storage, user_id, 25.0, 'expense')
+    storage.delete(transaction)
+    storage.save()
+    assert totals(storage, user_id) == (60.0, 0.0)
+
+
+def test_rolled_back_changes_leave_totals(storage, user_id):
+    add(storage, user_id, 40.0, 'income')
+    with pytest.raises(RuntimeError):
+        with storage.batch():
+            add(storage, user_id, 15.0, 'income')
+            raise RuntimeError
+    assert totals(storage, user_id) == (40.0, 0.0)
+
+
+def test_deleting_user_removes_totals(storage, user_id):
+    add(storage, user_id, 40.0, 'income')
+    add(storage, user_id, 10.0, 'expense')
+    storage.close()
+    storage.delete(storage.get(User, id=user_id))
+    storage.save()
+    storage.close()
+    assert storage.get(UserTotals, user_id=user_id) is None
+    assert storage.by_user(Transaction, user_id) == []
+
+
+def test_rebuild_totals_repairs_drift(storage, user_id):
+    add(storage, user_id, 70.0, 'income')
+    add(storage, user_id, 30.0, 'expense')
+    row = storage.get(UserTotals, user_id=user_id)
+    row.total_income = 1.0
+    storage.save()
+
+    drift = [d for d in storage.rebuild_totals() if d[0] == user_id]
+    assert drift == [(user_id, (1.0, 30.0), (70.0, 30.0))]
+    assert totals(storage, user_id) == (70.0, 30.0)
+    assert user_id not in [d[0] for d in storage.rebuild_totals()]
+
+
+def test_rebuild_totals_restores_missing_row(storage, user_id):
+    add(storage, user_id, 5.0, 'expense')
+    storage.delete(storage.get(UserTotals, user_id=user_id))
+    storage.save()
+    assert totals(storage, user_id) == (0.0, 5.0)
+
+    drift = [d for d in storage.rebuild_totals() if d[0] == user_id]
+    assert drift == [(user_id, None, (0.0, 5.0))]
+    storage.close()
+    assert storage.get(UserTotals, user_id=user_id).total_expenses == 5.0
+
+
+def test_repair_totals_command(storage, user_id):
+    from api.app import app
+
+    add(storage, user_id, 9.0, 'income')
+    row = storage.get(UserTotals, user_id=user_id)
+    row.total_income = 0.0
+    storage.save()
+    storage.close()
+
+    result = app.test_cli_runner().invoke(args=['repair-totals'])
+    assert result.exit_code == 0, result.output
+    assert f'{user_id}: income 0.0 -> 9.0' in result.output
+    assert totals(storage, user_id) == (9.0, 0.0)
@@ -19,6 +19,7 @@ const BudgetComponent = () => {
   const [isEditing, setIsEditing] = useState(null);
   const [editBudget, setEditBudget] = useState({ name: '', amount: '' });
   const [budgetColors, setBudgetColors] = useState({});
+  const [budgetExpenses, setBudgetExpenses] = useState({});
 
   const getRandomColor = () => {
     return '#' + Math.floor(Math.random() * 16777215).toString(16).padStart(6, '0');
@@ -100,14 +101,17 @@ const BudgetComponent = () => {
     }
 
     try {
-      const updatedBudget = { ...budget, spent: budget.spent + expense.amount, expenses: [...budget.expenses, expense] };
-      await budgetService.updateBudget(budget.id, updatedBudget, user.token);
+      const { expense: addedExpense, spent } = await budgetService.addExpense(
+        budget.id, { name: expense.name, amount: expense.amount }, user.token);
 
       const updatedBudgets = budgets.map((b) =>
-        b.id === budget.id ? updatedBudget : b
+        b.id === budget.id ? { ...b, spent } : b
       );
 
       setBudgets(updatedBudgets);
+      setBudgetExpenses((prev) => prev[budget.id]
+        ? { ...prev, [budget.id]: [addedExpense, ...prev[budget.id]] }
+        : prev);
       setNewExpense({ name: '', amount: '', category: '' });
     } catch (error) {
       console.error(error);
@@ -128,31 +132,35 @@ const BudgetComponent = () => {
     }
   };
 
-  const deleteExpense = async (budgetId, expenseAmount, expenseIndex) => {
+  const deleteExpense = async (budgetId, expenseId) => {
     try {
-      const budget = budgets.find((b) => b.id === budgetId);
-      const updatedBudget = {
-        ...budget,
-        spent: budget.spent - expenseAmount,
-        expenses: budget.expenses.filter((_, index) => index !== expenseIndex),
-      };
-      await budgetService.updateBudget(budgetId, updatedBudget, user.token);
+      const { spent } = await budgetService.deleteExpense(budgetId, expenseId, user.token);
 
       const updatedBudgets = budgets.map((b) =>
-        b.id === budgetId ? updatedBudget : b
+        b.id === budgetId ? { ...b, spent } : b
       );
 
       setBudgets(updatedBudgets);
+      setBudgetExpenses((prev) => ({
+        ...prev,
+        [budgetId]: (prev[budgetId] || []).filter((expense) => expense.id !== expenseId),
+      }));
     } catch (error) {
       console.error(error);
     }
   };
 
-  const toggleDetails = (budgetId) => {
+  const toggleDetails = async (budgetId) => {
     if (selectedBudget === budgetId) {
       setSelectedBudget(null);
     } else {
       setSelectedBudget(budgetId);
+      try {
+        const { expenses } = await budgetService.getExpenses(budgetId, user.token);
+        setBudgetExpenses((prev) => ({ ...prev, [budgetId]: expenses }));
+      } catch (error) {
+        console.error(error);
+      }
     }
   };
 
@@ -179,7 +187,7 @@ const BudgetComponent = () => {
 
     try {
       const updatedBudget = { ...editBudget, amount: parseFloat(editBudget.amount) };
-      await budgetService.updateBudget(updatedBudget.id, updatedBudget, user.token);
+      await budgetService.updateBudget(updatedBudget.id, { name: updatedBudget.name, amount: updatedBudget.amount }, user.token);
 
       const updatedBudgets = budgets.map((budget) =>
         budget.id === updatedBudget.id ? updatedBudget : budget
@@ -382,15 +390,15 @@ const BudgetComponent = () => {
                   {selectedBudget === budget.id && (
                     <Table striped bordered hover className="mt-3">
                       <tbody>
-                        {budget.expenses.map((expense, expenseIndex) => (
-                          <tr key={expenseIndex}>
+                        {(budgetExpenses[budget.id] || []).map((expense, expenseIndex) => (
+                          <tr key={expense.id}>
                             <td>{expenseIndex + 1}</td>
                             <td>{expense.name}</td>
                             <td><span dir="ltr">${expense.amount.toFixed(2)}</span></td>
                             <td>
                               <Button
                                 variant="danger"
-                                onClick={() => deleteExpense(budget.id, expense.amount, expenseIndex)}
+                                onClick={() => deleteExpense(budget.id, expense.id)}
                               >
                                 <FaTrash />
                               </Button>
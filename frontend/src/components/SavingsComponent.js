@@ -20,6 +20,7 @@ const SavingsComponent = () => {
   const [isEditing, setIsEditing] = useState(null);
   const [editSaving, setEditSaving] = useState({ name: '', goal: '' });
   const [savingColors, setSavingColors] = useState({});
+  const [savingContributions, setSavingContributions] = useState({});
   
   const getRandomColor = () => {
     return '#' + Math.floor(Math.random() * 16777215).toString(16).padStart(6, '0');
@@ -101,14 +102,17 @@ const SavingsComponent = () => {
     }
 
     try {
-      const updatedSaving = { ...saving, saved: saving.saved + contribution.amount, contributions: [...saving.contributions, contribution] };
-      await savingsService.updateSaving(saving.id, updatedSaving, user.token);
+      const { contribution: addedContribution, saved } = await savingsService.addContribution(
+        saving.id, { name: contribution.name, amount: contribution.amount }, user.token);
 
       const updatedSavings = savings.map((s) =>
-        s.id === saving.id ? updatedSaving : s
+        s.id === saving.id ? { ...s, saved } : s
       );
 
       setSavings(updatedSavings);
+      setSavingContributions((prev) => prev[saving.id]
+        ? { ...prev, [saving.id]: [addedContribution, ...prev[saving.id]] }
+        : prev);
       setNewContribution({ name: '', amount: '', category: '' });
     } catch (error) {
       console.error(error);
@@ -129,31 +133,35 @@ const SavingsComponent = () => {
     }
   };
 
-  const deleteContribution = async (savingId, expenseAmount, expenseIndex) => {
+  const deleteContribution = async (savingId, contributionId) => {
     try {
-      const saving = savings.find((s) => s.id === savingId);
-      const updatedSaving = {
-        ...saving,
-        saved: saving.saved - expenseAmount,
-        contributions: saving.contributions.filter((_, index) => index !== expenseIndex),
-      };
-      await savingsService.updateSaving(savingId, updatedSaving, user.token);
+      const { saved } = await savingsService.deleteContribution(savingId, contributionId, user.token);
 
       const updatedSavings = savings.map((s) =>
-        s.id === savingId ? updatedSaving : s
+        s.id === savingId ? { ...s, saved } : s
       );
 
       setSavings(updatedSavings);
+      setSavingContributions((prev) => ({
+        ...prev,
+        [savingId]: (prev[savingId] || []).filter((contribution) => contribution.id !== contributionId),
+      }));
     } catch (error) {
       console.error(error);
     }
   };
 
-  const toggleDetails = (savingId) => {
+  const toggleDetails = async (savingId) => {
     if (selectedSaving === savingId) {
       setSelectedSaving(null);
     } else {
       setSelectedSaving(savingId);
+      try {
+        const { contributions } = await savingsService.getContributions(savingId, user.token);
+        setSavingContributions((prev) => ({ ...prev, [savingId]: contributions }));
+      } catch (error) {
+        console.error(error);
+      }
     }
   };
 
@@ -179,7 +187,7 @@ const SavingsComponent = () => {
     }
     try {
       const updatedSaving = { ...editSaving, goal: parseFloat(editSaving.goal) };
-      await savingsService.updateSaving(updatedSaving.id, updatedSaving, user.token);
+      await savingsService.updateSaving(updatedSaving.id, { name: updatedSaving.name, goal: updatedSaving.goal }, user.token);
 
       const updatedSavings = savings.map((saving) =>
         saving.id === updatedSaving.id ? updatedSaving : saving
@@ -382,15 +390,15 @@ const SavingsComponent = () => {
                   {selectedSaving === saving.id && (
                     <Table striped bordered hover className="mt-3">
                       <tbody>
-                        {saving.contributions.map((contribution, contributionIndex) => (
-                          <tr key={contributionIndex}>
+                        {(savingContributions[saving.id] || []).map((contribution, contributionIndex) => (
+                          <tr key={contribution.id}>
                             <td>{contributionIndex + 1}</td>
                             <td>{contribution.name}</td>
                             <td>${contribution.amount.toFixed(2)}</td>
                             <td>
                               <Button
                                 variant="danger"
-                                onClick={() => deleteContribution(saving.id, contribution.amount, contributionIndex)}
+                                onClick={() => deleteContribution(saving.id, contribution.id)}
                               >
                                 <FaTrash />
                               </Button>
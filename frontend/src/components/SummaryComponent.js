@@ -64,85 +64,43 @@ const SummaryComponent = () => {
     // eslint-disable-next-line react-hooks/exhaustive-deps
   }, []);
 
-  const generateGraphData = (timeFrame, transactions) => {
-    const now = new Date();
-    const startDate = getStartDate(now, timeFrame);
-    const endDate = new Date(now.getTime());
-  
-    const labels = generateLabels(timeFrame, transactions.length);
-    const daysInPeriod = getDaysInPeriod(timeFrame, startDate, endDate);
-  
-    const incomeData = new Array(daysInPeriod).fill(0);
-    const expenseData = new Array(daysInPeriod).fill(0);
-  
-    transactions.forEach((transaction) => {
-      const transactionDate = new Date(transaction.date);
-      const dayIndex = getDayIndex(timeFrame, startDate, transactionDate);
-      if (dayIndex !== -1) {
-        if (transaction.type === 'income') {
-          incomeData[dayIndex] += transaction.amount;
-        } else {
-          expenseData[dayIndex] += transaction.amount;
-        }
-      }
-    });
-  
-    return {
-      labels,
-      incomeData,
-      expenseData,
-    };
-  };
-  
-  const getStartDate = (now, timeFrame) => {
-    switch (timeFrame) {
-      case 'week':
-        const firstDayOfWeek = now.getDate() - now.getDay();
-        return new Date(now.setDate(firstDayOfWeek));
-      case 'month':
-        return new Date(now.getFullYear(), now.getMonth(), 1);
-      case 'year':
-        return new Date(now.getFullYear(), 0, 1);
-      default:
-        return now;
-    }
-  };
-  
-  const getDaysInPeriod = (timeFrame, startDate, endDate) => {
-    switch (timeFrame) {
-      case 'week':
-        return 7;
-      case 'month':
-        return new Date(endDate.getFullYear(), endDate.getMonth() + 1, 0).getDate();
-      case 'year':
-        return isLeapYear(endDate.getFullYear()) ? 366 : 365;
-      default:
-        return 1;
-    }
+  const toISODate = (date) => {
+    const month = String(date.getMonth() + 1).padStart(2, '0');
+    const day = String(date.getDate()).padStart(2, '0');
+    return `${date.getFullYear()}-${month}-${day}`;
   };
-  
-  const getDayIndex = (timeFrame, startDate, transactionDate) => {
-    const daysDifference = Math.floor((transactionDate - startDate) / (1000 * 60 * 60 * 24));
+
+  const getSeriesParams = (timeFrame) => {
+    const now = new Date();
     switch (timeFrame) {
       case 'week':
-        return transactionDate.getDay();
+        const monday = new Date(now.getFullYear(), now.getMonth(), now.getDate() - ((now.getDay() + 6) % 7));
+        const sunday = new Date(monday.getFullYear(), monday.getMonth(), monday.getDate() + 6);
+        return { bucket: 'day', from: toISODate(monday), to: toISODate(sunday) };
       case 'month':
-        return Math.floor(daysDifference / 7);
+        return {
+          bucket: 'week',
+          from: toISODate(new Date(now.getFullYear(), now.getMonth(), 1)),
+          to: toISODate(new Date(now.getFullYear(), now.getMonth() + 1, 0))
+        };
       case 'year':
-        return transactionDate.getMonth();
+        return {
+          bucket: 'month',
+          from: toISODate(new Date(now.getFullYear(), 0, 1)),
+          to: toISODate(new Date(now.getFullYear(), 11, 31))
+        };
       default:
-        return -1;
+        return { bucket: 'day', from: toISODate(now), to: toISODate(now) };
     }
   };
-  
-  const isLeapYear = (year) => {
-    return (year % 4 === 0 && year % 100 !== 0) || year % 400 === 0;
-  };
 
   useEffect(() => {
     const fetchData = async () => {
       try {
-        const summaryData = await summaryService.getSummary(user.token);
+        const [summaryData, series] = await Promise.all([
+          summaryService.getSummary(user.token),
+          summaryService.getSeries(getSeriesParams(timeFrame), user.token)
+        ]);
         const translatedDefaultBudgets = translateDefaultBudgets(summaryData.budgets);
         const translatedDefaultSavings = translateDefaultSavings(summaryData.savings);
         const translatedSummaryData = {
@@ -152,9 +110,11 @@ const SummaryComponent = () => {
         };
         setSummary(translatedSummaryData);
   
-        const transactions = [...summaryData.incomeTransactions, ...summaryData.expenseTransactions];
-        const graphData = generateGraphData(timeFrame, transactions);
-        setGraphData(graphData);
+        setGraphData({
+          labels: generateLabels(timeFrame, series.labels.length),
+          incomeData: series.income,
+          expenseData: series.expenses,
+        });
   
         const pieData = {
           total_income: summaryData.total_income,
@@ -180,12 +140,7 @@ const SummaryComponent = () => {
       case 'week':
         return [t('mon'), t('tue'), t('wed'), t('thu'), t('fri'), t('sat'), t('sun')];
       case 'month':
-        const now = new Date();
-        const startDate = new Date(now.getFullYear(), now.getMonth(), 1);
-        const endDate = new Date(now.getFullYear(), now.getMonth() + 1, 0);
-        const daysInMonth = endDate.getDate();
-        const weeksInMonth = Math.ceil(daysInMonth / 7);
-        return Array.from({ length: weeksInMonth }, (_, i) => `${t('month_weeks')} ${i + 1}`);
+        return Array.from({ length: dataLength }, (_, i) => `${t('month_weeks')} ${i + 1}`);
       case 'year':
         return [
           t('jan'), t('feb'), t('mar'), t('apr'), t('may'), t('jun'),
@@ -53,6 +53,43 @@ const budgetService = {
     }
   },
 
+  getExpenses: async (budgetId, token, before = null) => {
+    await userService.refreshToken();
+    try {
+      const response = await axios.get(`${API_BASE_URL}/budgets/${budgetId}/expenses`, {
+        headers: { Authorization: `Bearer ${token}` },
+        params: before ? { before } : {}
+      });
+      return { expenses: response.data, nextCursor: response.headers['x-next-cursor'] || null };
+    } catch (error) {
+      throw error.response ? error.response.data : new Error('Network Error');
+    }
+  },
+
+  addExpense: async (budgetId, expense, token) => {
+    await userService.refreshToken();
+    try {
+      const response = await axios.post(`${API_BASE_URL}/budgets/${budgetId}/expenses`, expense, {
+        headers: { Authorization: `Bearer ${token}` }
+      });
+      return response.data;
+    } catch (error) {
+      throw error.response ? error.response.data : new Error('Network Error');
+    }
+  },
+
+  deleteExpense: async (budgetId, expenseId, token) => {
+    await userService.refreshToken();
+    try {
+      const response = await axios.delete(`${API_BASE_URL}/budgets/${budgetId}/expenses/${expenseId}`, {
+        headers: { Authorization: `Bearer ${token}` }
+      });
+      return response.data;
+    } catch (error) {
+      throw error.response ? error.response.data : new Error('Network Error');
+    }
+  },
+
   deleteBudget: async (id, token) => {
     await userService.refreshToken();
     try {
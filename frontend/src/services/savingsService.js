@@ -52,6 +52,43 @@ const savingsService = {
     }
   },
 
+  getContributions: async (savingsId, token, before = null) => {
+    await userService.refreshToken();
+    try {
+      const response = await axios.get(`${API_BASE_URL}/savings/${savingsId}/contributions`, {
+        headers: { Authorization: `Bearer ${token}` },
+        params: before ? { before } : {}
+      });
+      return { contributions: response.data, nextCursor: response.headers['x-next-cursor'] || null };
+    } catch (error) {
+      throw error.response ? error.response.data : new Error('Network Error');
+    }
+  },
+
+  addContribution: async (savingsId, contribution, token) => {
+    await userService.refreshToken();
+    try {
+      const response = await axios.post(`${API_BASE_URL}/savings/${savingsId}/contributions`, contribution, {
+        headers: { Authorization: `Bearer ${token}` }
+      });
+      return response.data;
+    } catch (error) {
+      throw error.response ? error.response.data : new Error('Network Error');
+    }
+  },
+
+  deleteContribution: async (savingsId, contributionId, token) => {
+    await userService.refreshToken();
+    try {
+      const response = await axios.delete(`${API_BASE_URL}/savings/${savingsId}/contributions/${contributionId}`, {
+        headers: { Authorization: `Bearer ${token}` }
+      });
+      return response.data;
+    } catch (error) {
+      throw error.response ? error.response.data : new Error('Network Error');
+    }
+  },
+
   deleteSaving: async (id, token) => {
     await userService.refreshToken();
     try {
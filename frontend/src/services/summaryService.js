@@ -14,6 +14,19 @@ const summaryService = {
     } catch (error) {
       throw error.response ? error.response.data : new Error('Network Error');
     }
+  },
+
+  getSeries: async (params, token) => {
+    await userService.refreshToken();
+    try {
+      const response = await axios.get(`${API_BASE_URL}/summary/series`, {
+        headers: { Authorization: `Bearer ${token}` },
+        params
+      });
+      return response.data;
+    } catch (error) {
+      throw error.response ? error.response.data : new Error('Network Error');
+    }
   }
 };
 
@@ -2,15 +2,28 @@ import axios from 'axios';
 import userService from './userService';
 
 const API_BASE_URL = process.env.REACT_APP_API_BASE_URL;
+const PAGE_SIZE = 500;
+
+const getTransactionsPage = async (token, before = null) => {
+  const response = await axios.get(`${API_BASE_URL}/transactions`, {
+    headers: { Authorization: `Bearer ${token}` },
+    params: before ? { limit: PAGE_SIZE, before } : { limit: PAGE_SIZE }
+  });
+  return { transactions: response.data, nextCursor: response.headers['x-next-cursor'] || null };
+};
 
 const transactionService = {
   getAllTransactions: async (token) => {
     await userService.refreshToken();
     try {
-      const response = await axios.get(`${API_BASE_URL}/transactions`, {
-        headers: { Authorization: `Bearer ${token}` }
-      });
-      return response.data;
+      const transactions = [];
+      let before = null;
+      do {
+        const page = await getTransactionsPage(token, before);
+        transactions.push(...page.transactions);
+        before = page.nextCursor;
+      } while (before);
+      return transactions;
     } catch (error) {
       throw error.response ? error.response.data : new Error('Network Error');
     }